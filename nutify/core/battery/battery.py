@@ -34,7 +34,7 @@ def get_available_battery_metrics():
         
         # Log of raw data from the UPS
         ups_data = get_ups_data()
-        logger.debug(f"🔍 Raw UPS data: {ups_data.__dict__}")
+        logger.debug(f"🔍 Raw UPS data: {ups_data}")
         
         # Complete list of possible battery metrics
         battery_metrics = [
@@ -82,10 +82,10 @@ def get_available_battery_metrics():
                     available_metrics[metric] = value
         
         # Fallback: if battery_date or battery_mfr_date not found in available_metrics,
-        # use the value from ups_data.__dict__ if present
+        # use the value from ups_data if present
         for key in ['battery_date', 'battery_mfr_date']:
-            if key not in available_metrics and key in ups_data.__dict__:
-                value = ups_data.__dict__[key]
+            if key not in available_metrics and key in ups_data:
+                value = ups_data[key]
                 if hasattr(value, 'isoformat'):
                     try:
                         value = value.isoformat()
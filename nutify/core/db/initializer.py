@@ -14,6 +14,15 @@ from .integrity import check_database_integrity
 from core.logger import system_logger as logger
 from core.db.model_classes import init_model_classes, register_models_for_global_access
 
+# Every read of ups_dynamic_data filters on a timestamp_utc range (hourly and
+# daily averages, energy and voltage charts); without an index each of them
+# scans the whole table. IF NOT EXISTS also covers databases created before
+# the index was introduced.
+_SQL_CREATE_DYNAMIC_TIMESTAMP_INDEX = text(
+    "CREATE INDEX IF NOT EXISTS ix_ups_dynamic_data_timestamp_utc "
+    "ON ups_dynamic_data(timestamp_utc)"
+)
+
 def get_app_timezone():
     """
     Returns the application's CACHE_TIMEZONE.
@@ -71,6 +80,10 @@ def init_database(app, db):
             logger.info("✅ UPS dynamic data table created")
         else:
             logger.info("✅ UPS dynamic data table already exists")
+
+        with db.engine.begin() as connection:
+            connection.execute(_SQL_CREATE_DYNAMIC_TIMESTAMP_INDEX)
+        logger.info("✅ UPS dynamic data timestamp index ready")
         
         logger.info("✅ UPS data models initialized successfully")
         
@@ -108,7 +121,9 @@ def init_database(app, db):
 
         # Step 6.5: Run multi-UPS migration if needed
         logger.info("🔄 Step 6.5: Checking for multi-UPS migration...")
-        from core.db.migrations import check_migration_needed, run_multi_ups_migration
+        from core.db.migrations import (
+            check_migration_needed, run_multi_ups_migration, upgrade_enabled_index
+        )
         if check_migration_needed(db):
             logger.info("🚀 Running multi-UPS migration...")
             if run_multi_ups_migration(db, app):
@@ -118,6 +133,9 @@ def init_database(app, db):
         else:
             logger.info("✅ Multi-UPS schema already up to date")
 
+        # Databases migrated earlier may still have the old enabled-devices index
+        upgrade_enabled_index(db)
+
         # Step 7: Register models in UPS module to ensure they're available globally
         logger.info("🔗 Step 7: Registering models globally...")
         from core.db.ups import register_models_from_modelclasses
@@ -163,12 +163,10 @@ class ConnectionMonitor:
             bool: True if connected, False otherwise
         """
         with self._state_lock:
-            # Ensure UPS configuration is available
+            # Ensure UPS configuration is available (loaded from the database if needed)
             if not ups_config.is_initialized():
-                ups_config.load_from_database()
-                if not ups_config.is_initialized():
-                    logger.error("❌ UPS configuration not initialized, cannot check connection")
-                    return False
+                logger.error("❌ UPS configuration not initialized, cannot check connection")
+                return False
             
             # Get connection parameters
             upsc_command = UPSC_BIN
@@ -3,8 +3,65 @@ Database migrations module for Nutify.
 
 This module handles database schema migrations to support multi-UPS functionality
 and other future schema changes.
+
+The migration modules are imported lazily: they are only loaded when the
+schema actually has to be checked or migrated.
 """
 
-from .multi_ups_migration import run_multi_ups_migration, check_migration_needed
+# Set once the schema is known to be up to date in this process
+_schema_up_to_date = False
+
+def check_migration_needed(db):
+    """
+    Check if multi-UPS migration is needed.
+
+    Args:
+        db: SQLAlchemy database instance
+
+    Returns:
+        bool: True if migration is needed, False otherwise
+    """
+    global _schema_up_to_date
+
+    if _schema_up_to_date:
+        return False
+
+    from .multi_ups_migration import check_migration_needed as _check_migration_needed
+    needed = _check_migration_needed(db)
+    if not needed:
+        _schema_up_to_date = True
+    return needed
+
+def run_multi_ups_migration(db, app=None):
+    """
+    Run the multi-UPS migration.
+
+    Args:
+        db: SQLAlchemy database instance
+        app: Flask application instance (optional, for accessing config)
+
+    Returns:
+        bool: True if migration succeeded, False otherwise
+    """
+    global _schema_up_to_date
+
+    from .multi_ups_migration import run_multi_ups_migration as _run_multi_ups_migration
+    success = _run_multi_ups_migration(db, app)
+    if success:
+        _schema_up_to_date = True
+    return success
+
+def upgrade_enabled_index(db):
+    """
+    Rebuild idx_ups_devices_enabled if its column list is outdated.
+
+    Args:
+        db: SQLAlchemy database instance
+
+    Returns:
+        bool: True if the index was rebuilt, False otherwise
+    """
+    from .multi_ups_migration import upgrade_enabled_index as _upgrade_enabled_index
+    return _upgrade_enabled_index(db)
 
-__all__ = ['run_multi_ups_migration', 'check_migration_needed']
+__all__ = ['run_multi_ups_migration', 'check_migration_needed', 'upgrade_enabled_index']
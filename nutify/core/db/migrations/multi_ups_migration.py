@@ -10,15 +10,185 @@ This migration adds support for multiple UPS devices by:
 
 import logging
 import os
-import json
+import re
+import mmap
+from functools import lru_cache
+from contextlib import nullcontext
 from datetime import datetime
 from sqlalchemy import text, inspect
-from pathlib import Path
+from sqlalchemy.exc import OperationalError
 
 logger = logging.getLogger('migration')
 
 MIGRATION_VERSION = '001_multi_ups'
 
+# Set once the schema_migrations row has been seen (or written) in this process
+_migration_applied = False
+
+# Columns of idx_ups_devices_enabled. They cover the enabled-devices query of
+# UPSConfigManager.load_from_database (id is the rowid)
+_ENABLED_INDEX_COLUMNS = (
+    'is_enabled', 'order_index', 'name', 'friendly_name', 'host', 'is_primary'
+)
+_CREATE_ENABLED_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_ups_devices_enabled "
+    f"ON ups_devices({', '.join(_ENABLED_INDEX_COLUMNS)})"
+)
+
+# DDL for each migration step, grouped per step. Every statement runs inside
+# the single migration transaction opened by _begin_migration(). They take no
+# parameters, so they are plain strings handed straight to the DB-API driver.
+_CREATE_UPS_DEVICES_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS ups_devices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(50) NOT NULL UNIQUE,
+        friendly_name VARCHAR(100),
+        driver VARCHAR(50) NOT NULL,
+        port VARCHAR(255) NOT NULL,
+        host VARCHAR(255) NOT NULL DEFAULT 'localhost',
+        description TEXT,
+        is_enabled BOOLEAN NOT NULL DEFAULT 1,
+        is_primary BOOLEAN NOT NULL DEFAULT 0,
+        connection_type VARCHAR(20),
+
+        vendor_id VARCHAR(10),
+        product_id VARCHAR(10),
+        serial VARCHAR(100),
+
+        snmp_version VARCHAR(10),
+        snmp_community VARCHAR(50),
+
+        baudrate INTEGER,
+
+        driver_options TEXT,
+
+        order_index INTEGER DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        last_seen_at DATETIME,
+
+        CHECK(is_enabled IN (0, 1)),
+        CHECK(is_primary IN (0, 1))
+    )
+    """,
+    _CREATE_ENABLED_INDEX_SQL,
+    "CREATE INDEX IF NOT EXISTS idx_ups_devices_name ON ups_devices(name)",
+)
+
+# Replaces an idx_ups_devices_enabled created with an older column list
+_REBUILD_ENABLED_INDEX_DDL = (
+    "DROP INDEX IF EXISTS idx_ups_devices_enabled",
+    _CREATE_ENABLED_INDEX_SQL,
+)
+
+_ADD_UPS_ID_TO_EVENTS_DDL = (
+    "ALTER TABLE ups_events ADD COLUMN ups_id INTEGER REFERENCES ups_devices(id)",
+    "CREATE INDEX IF NOT EXISTS idx_ups_events_ups_id ON ups_events(ups_id)",
+)
+
+_MARK_MIGRATION_COMPLETE_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(50) PRIMARY KEY,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    f"""
+    INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+    VALUES ('{MIGRATION_VERSION}', CURRENT_TIMESTAMP)
+    """,
+)
+
+# Parameterised statements are built once at import time and reused
+_SQL_MIGRATION_APPLIED = text("SELECT 1 FROM schema_migrations WHERE version = :v")
+
+# Seeds the primary migrated device only into an empty table; ON CONFLICT keeps
+# the statement idempotent if the same name is already present
+_SQL_SEED_PRIMARY_DEVICE = text("""
+    INSERT INTO ups_devices (
+        name, friendly_name, driver, port, host,
+        description, is_enabled, is_primary,
+        connection_type, order_index, created_at, updated_at
+    )
+    SELECT
+        :name, :friendly_name, :driver, :port, :host,
+        :description, 1, 1,
+        :connection_type, :order_index, :now, :now
+    WHERE NOT EXISTS (SELECT 1 FROM ups_devices)
+    ON CONFLICT(name) DO NOTHING
+""")
+
+# Remaining devices from a multi-section ups.conf, executed as one executemany
+_SQL_INSERT_DEVICE = text("""
+    INSERT INTO ups_devices (
+        name, friendly_name, driver, port, host,
+        description, is_enabled, is_primary,
+        connection_type, order_index, created_at, updated_at
+    ) VALUES (
+        :name, :friendly_name, :driver, :port, :host,
+        :description, 1, 0,
+        :connection_type, :order_index, :now, :now
+    )
+    ON CONFLICT(name) DO NOTHING
+""")
+
+# ups.conf lines: either a [section] header or a key = "value" pair.
+# Patterns are bytes so they can run directly over a memory-mapped file.
+_UPS_CONF_RE = re.compile(
+    rb'^[ \t]*(?:\[(?P<section>[^\]]+)\]'
+    rb'|(?P<key>\w+)[ \t]*=[ \t]*"?(?P<value>[^"\n#]*?)"?)[ \t]*(?:#.*)?$',
+    re.MULTILINE
+)
+
+# ups.conf keys carried over to ups_devices columns
+_UPS_CONF_FIELDS = {
+    b'driver': 'driver',
+    b'port': 'port',
+    b'desc': 'description',
+}
+
+_MONITOR_RE = re.compile(rb'^[ \t]*MONITOR[ \t]+([^@\s]+)@(\S+)', re.MULTILINE)
+
+@lru_cache(maxsize=1)
+def _get_inspector(engine):
+    """
+    Return a shared SQLAlchemy Inspector for the engine.
+
+    The inspector caches reflected metadata, so it is reused across the
+    migration run and cleared explicitly after DDL has been applied.
+    """
+    return inspect(engine)
+
+def _begin_migration(db):
+    """
+    Open the single transaction the whole migration runs in.
+
+    pysqlite does not emit BEGIN before DDL on its own, so it is issued
+    explicitly to keep CREATE/ALTER statements inside the transaction.
+    WAL journaling and synchronous=NORMAL are set first (journal_mode cannot
+    be changed inside a transaction) so the final commit costs one fsync.
+    """
+    conn = db.session.connection()
+    conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+    conn.exec_driver_sql("BEGIN")
+
+def _execute_statements(db, statements):
+    """
+    Execute a group of DDL statements in the current transaction.
+
+    exec_driver_sql() skips SQLAlchemy's statement compilation and keeps the
+    one-off DDL strings out of the compiled-statement cache.
+
+    Args:
+        db: SQLAlchemy database instance
+        statements: Iterable of raw SQL strings
+    """
+    conn = db.session.connection()
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
 def check_migration_needed(db):
     """
     Check if multi-UPS migration is needed.
@@ -29,8 +199,24 @@ def check_migration_needed(db):
     Returns:
         bool: True if migration is needed, False otherwise
     """
+    global _migration_applied
+
+    if _migration_applied:
+        return False
+
+    # Fast path: once the migration is recorded, skip schema reflection entirely
     try:
-        inspector = inspect(db.engine)
+        applied = db.session.execute(_SQL_MIGRATION_APPLIED, {'v': MIGRATION_VERSION}).scalar()
+        if applied:
+            _migration_applied = True
+            logger.debug(f"✅ Migration {MIGRATION_VERSION} already applied")
+            return False
+    except OperationalError:
+        # schema_migrations does not exist yet - fall back to reflection
+        db.session.rollback()
+
+    try:
+        inspector = _get_inspector(db.engine)
         table_names = inspector.get_table_names()
 
         # Check if ups_devices table exists
@@ -63,15 +249,22 @@ def run_multi_ups_migration(db, app=None):
     Returns:
         bool: True if migration succeeded, False otherwise
     """
+    global _migration_applied
+
     try:
         logger.info("🚀 Starting multi-UPS migration...")
 
+        # All steps share one transaction and are committed together at the end
+        _begin_migration(db)
+
         # Step 1: Create ups_devices table
         if not _create_ups_devices_table(db):
+            db.session.rollback()
             return False
 
         # Step 2: Add ups_id to ups_events
         if not _add_ups_id_to_events(db):
+            db.session.rollback()
             return False
 
         # Step 3: Migrate existing single-UPS configuration
@@ -81,6 +274,12 @@ def run_multi_ups_migration(db, app=None):
         # Step 4: Mark migration as complete
         _mark_migration_complete(db)
 
+        db.session.commit()
+        _migration_applied = True
+
+        # Schema changed - drop any metadata reflected before the DDL ran
+        _get_inspector(db.engine).clear_cache()
+
         logger.info("✅ Multi-UPS migration completed successfully")
         return True
 
@@ -89,159 +288,152 @@ def run_multi_ups_migration(db, app=None):
         db.session.rollback()
         return False
 
+def upgrade_enabled_index(db):
+    """
+    Rebuild idx_ups_devices_enabled if it was created with other columns.
+
+    CREATE INDEX IF NOT EXISTS leaves an existing index alone, so databases
+    migrated before the index became covering keep the old one until it is
+    dropped and created again. This runs on every start, after the migration
+    check, and only writes when the column list differs.
+
+    Args:
+        db: SQLAlchemy database instance
+
+    Returns:
+        bool: True if the index was rebuilt, False otherwise
+    """
+    try:
+        conn = db.session.connection()
+        columns = tuple(
+            row[2] for row in conn.exec_driver_sql("PRAGMA index_info(idx_ups_devices_enabled)")
+        )
+
+        # No index means ups_devices has not been migrated yet; the migration creates it
+        if not columns or columns == _ENABLED_INDEX_COLUMNS:
+            return False
+
+        logger.info("📊 Rebuilding idx_ups_devices_enabled...")
+
+        # Drop and create in one transaction, as in _begin_migration()
+        conn.exec_driver_sql("BEGIN")
+        _execute_statements(db, _REBUILD_ENABLED_INDEX_DDL)
+        db.session.commit()
+
+        logger.info("✅ idx_ups_devices_enabled rebuilt")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Failed to rebuild idx_ups_devices_enabled: {str(e)}")
+        db.session.rollback()
+        return False
+
 def _create_ups_devices_table(db):
     """Create the ups_devices table."""
     try:
         logger.info("📊 Creating ups_devices table...")
 
-        db.session.execute(text("""
-            CREATE TABLE IF NOT EXISTS ups_devices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name VARCHAR(50) NOT NULL UNIQUE,
-                friendly_name VARCHAR(100),
-                driver VARCHAR(50) NOT NULL,
-                port VARCHAR(255) NOT NULL,
-                host VARCHAR(255) NOT NULL DEFAULT 'localhost',
-                description TEXT,
-                is_enabled BOOLEAN NOT NULL DEFAULT 1,
-                is_primary BOOLEAN NOT NULL DEFAULT 0,
-                connection_type VARCHAR(20),
-
-                vendor_id VARCHAR(10),
-                product_id VARCHAR(10),
-                serial VARCHAR(100),
-
-                snmp_version VARCHAR(10),
-                snmp_community VARCHAR(50),
-
-                baudrate INTEGER,
-
-                driver_options TEXT,
-
-                order_index INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_seen_at DATETIME,
-
-                CHECK(is_enabled IN (0, 1)),
-                CHECK(is_primary IN (0, 1))
-            )
-        """))
-
-        db.session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_ups_devices_enabled
-            ON ups_devices(is_enabled)
-        """))
-
-        db.session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_ups_devices_name
-            ON ups_devices(name)
-        """))
+        _execute_statements(db, _CREATE_UPS_DEVICES_DDL)
 
-        db.session.commit()
         logger.info("✅ ups_devices table created successfully")
         return True
 
     except Exception as e:
         logger.error(f"❌ Failed to create ups_devices table: {str(e)}")
-        db.session.rollback()
         return False
 
 def _add_ups_id_to_events(db):
     """Add ups_id column to ups_events table."""
     try:
-        inspector = inspect(db.engine)
-
-        # Check if ups_events table exists
-        if 'ups_events' not in inspector.get_table_names():
-            logger.debug("ℹ️ ups_events table doesn't exist yet, skipping ups_id addition")
-            return True
-
-        # Check if ups_id column already exists
-        columns = [col['name'] for col in inspector.get_columns('ups_events')]
-        if 'ups_id' in columns:
-            logger.debug("✅ ups_events.ups_id column already exists")
-            return True
-
         logger.info("📊 Adding ups_id column to ups_events table...")
 
-        db.session.execute(text("""
-            ALTER TABLE ups_events
-            ADD COLUMN ups_id INTEGER REFERENCES ups_devices(id)
-        """))
-
-        db.session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_ups_events_ups_id
-            ON ups_events(ups_id)
-        """))
+        # The ALTER is attempted directly; SQLite reports a missing table or an
+        # existing column as an OperationalError, which is cheaper than reflecting
+        try:
+            _execute_statements(db, _ADD_UPS_ID_TO_EVENTS_DDL)
+        except OperationalError as e:
+            message = str(e).lower()
+            if 'no such table' in message:
+                logger.debug("ℹ️ ups_events table doesn't exist yet, skipping ups_id addition")
+                return True
+            if 'duplicate column' in message:
+                logger.debug("✅ ups_events.ups_id column already exists")
+                return True
+            raise
 
-        db.session.commit()
         logger.info("✅ ups_id column added to ups_events")
         return True
 
     except Exception as e:
         logger.error(f"❌ Failed to add ups_id to ups_events: {str(e)}")
-        db.session.rollback()
         return False
 
 def _migrate_existing_config(db):
     """
     Migrate existing single-UPS configuration to ups_devices table.
-    Reads from NUT configuration files and creates the first entry.
+    Reads from NUT configuration files and creates one entry per configured
+    UPS; the first one becomes the primary device.
     """
     try:
-        # Check if ups_devices already has entries
-        result = db.session.execute(text("SELECT COUNT(*) FROM ups_devices")).scalar()
-        if result > 0:
-            logger.info(f"✅ ups_devices table already has {result} entries, skipping migration")
-            return True
-
         logger.info("🔄 Migrating existing single-UPS configuration...")
 
         # Try to read from NUT configuration files
-        ups_config = _parse_nut_config()
+        ups_configs = _parse_nut_config()
 
-        if not ups_config:
+        if not ups_configs:
             logger.warning("⚠️ No existing NUT configuration found")
             return False
 
-        # Insert the migrated UPS configuration
-        db.session.execute(text("""
-            INSERT INTO ups_devices (
-                name, friendly_name, driver, port, host,
-                description, is_enabled, is_primary,
-                connection_type, order_index, created_at, updated_at
-            ) VALUES (
-                :name, :friendly_name, :driver, :port, :host,
-                :description, 1, 1,
-                :connection_type, 0, :now, :now
-            )
-        """), {
-            'name': ups_config.get('name', 'ups'),
-            'friendly_name': ups_config.get('friendly_name', ups_config.get('name', 'UPS')),
-            'driver': ups_config.get('driver', 'usbhid-ups'),
-            'port': ups_config.get('port', 'auto'),
-            'host': ups_config.get('host', 'localhost'),
-            'description': ups_config.get('description', 'Migrated from single-UPS setup'),
-            'connection_type': ups_config.get('connection_type', 'local_usb'),
-            'now': datetime.utcnow()
-        })
+        now = datetime.utcnow()
+        params = [
+            {
+                'name': ups_config['name'],
+                'friendly_name': ups_config['friendly_name'],
+                'driver': ups_config['driver'],
+                'port': ups_config['port'],
+                'host': ups_config['host'],
+                'description': ups_config.get('description', 'Migrated from single-UPS setup'),
+                'connection_type': ups_config['connection_type'],
+                'order_index': order_index,
+                'now': now
+            }
+            for order_index, ups_config in enumerate(ups_configs)
+        ]
+
+        # Insert the primary UPS (no-op if devices already exist)
+        result = db.session.execute(_SQL_SEED_PRIMARY_DEVICE, params[0])
+
+        if result.rowcount == 0:
+            logger.info("✅ ups_devices table already has entries, skipping migration")
+            return True
 
-        db.session.commit()
-        logger.info(f"✅ Migrated existing UPS: {ups_config.get('name', 'ups')}")
+        # Insert any additional UPS sections in a single executemany
+        if len(params) > 1:
+            db.session.execute(_SQL_INSERT_DEVICE, params[1:])
+
+        logger.info(f"✅ Migrated existing UPS: {', '.join(p['name'] for p in params)}")
         return True
 
     except Exception as e:
         logger.error(f"❌ Failed to migrate existing config: {str(e)}")
-        db.session.rollback()
         return False
 
+def _map_file(f):
+    """
+    Memory-map an open binary file for read-only scanning.
+
+    Empty files cannot be mapped, so they yield an empty bytes object instead.
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        return nullcontext(b'')
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
 def _parse_nut_config():
     """
-    Parse NUT configuration files to extract existing UPS configuration.
+    Parse NUT configuration files to extract existing UPS configurations.
 
     Returns:
-        dict: UPS configuration or None if not found
+        list: One configuration dict per UPS section, or None if not found
     """
     try:
         # Default NUT config path
@@ -253,66 +445,53 @@ def _parse_nut_config():
             logger.debug(f"ℹ️ ups.conf not found at {ups_conf_path}")
             return None
 
-        ups_config = {}
+        ups_configs = []
 
-        # Parse ups.conf
-        with open(ups_conf_path, 'r') as f:
-            current_ups = None
-            for line in f:
-                line = line.strip()
-
-                # Skip comments and empty lines
-                if not line or line.startswith('#'):
+        # Parse ups.conf: section headers and key = value pairs in one scan
+        current_ups = None
+        with open(ups_conf_path, 'rb') as f, _map_file(f) as ups_conf:
+            for match in _UPS_CONF_RE.finditer(ups_conf):
+                section = match.group('section')
+                if section is not None:
+                    current_ups = {'name': section.decode('utf-8')}
+                    ups_configs.append(current_ups)
                     continue
 
-                # UPS section header [ups_name]
-                if line.startswith('[') and line.endswith(']'):
-                    current_ups = line[1:-1]
-                    ups_config['name'] = current_ups
-                    continue
+                if current_ups is not None:
+                    field = _UPS_CONF_FIELDS.get(match.group('key'))
+                    if field:
+                        current_ups[field] = match.group('value').decode('utf-8')
 
-                # Parse key = value pairs
-                if current_ups and '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip().strip('"')
-
-                    if key == 'driver':
-                        ups_config['driver'] = value
-                    elif key == 'port':
-                        ups_config['port'] = value
-                    elif key == 'desc':
-                        ups_config['description'] = value
-
-        # Parse upsmon.conf for host
+        # Parse upsmon.conf for hosts
+        # Format: MONITOR ups@localhost 1 user pass master
+        monitors = {}
         if os.path.exists(upsmon_conf_path):
-            with open(upsmon_conf_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('MONITOR'):
-                        # Format: MONITOR ups@localhost 1 user pass master
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            ups_at_host = parts[1]
-                            if '@' in ups_at_host:
-                                name, host = ups_at_host.split('@', 1)
-                                if 'name' not in ups_config:
-                                    ups_config['name'] = name
-                                ups_config['host'] = host
-                            break
+            with open(upsmon_conf_path, 'rb') as f, _map_file(f) as upsmon_conf:
+                for monitor in _MONITOR_RE.finditer(upsmon_conf):
+                    name, host = (group.decode('utf-8') for group in monitor.groups())
+                    monitors.setdefault(name, host)
+
+        if monitors:
+            first_name, first_host = next(iter(monitors.items()))
+            if not ups_configs:
+                # No ups.conf sections: fall back to the monitored UPS
+                ups_configs.append({'name': first_name})
+            for ups_config in ups_configs:
+                ups_config['host'] = monitors.get(ups_config['name'], first_host)
 
         # Set defaults if not found
-        if 'name' not in ups_config:
+        if not ups_configs:
             return None
 
-        ups_config.setdefault('driver', 'usbhid-ups')
-        ups_config.setdefault('port', 'auto')
-        ups_config.setdefault('host', 'localhost')
-        ups_config.setdefault('friendly_name', ups_config['name'])
-        ups_config.setdefault('connection_type', 'local_usb')
+        for ups_config in ups_configs:
+            ups_config.setdefault('driver', 'usbhid-ups')
+            ups_config.setdefault('port', 'auto')
+            ups_config.setdefault('host', 'localhost')
+            ups_config.setdefault('friendly_name', ups_config['name'])
+            ups_config.setdefault('connection_type', 'local_usb')
 
-        logger.info(f"📋 Parsed existing UPS config: {ups_config['name']}")
-        return ups_config
+        logger.info(f"📋 Parsed existing UPS config: {', '.join(c['name'] for c in ups_configs)}")
+        return ups_configs
 
     except Exception as e:
         logger.error(f"❌ Error parsing NUT config: {str(e)}")
@@ -321,23 +500,8 @@ def _parse_nut_config():
 def _mark_migration_complete(db):
     """Mark migration as complete in database."""
     try:
-        # Create a simple migration tracking table if it doesn't exist
-        db.session.execute(text("""
-            CREATE TABLE IF NOT EXISTS schema_migrations (
-                version VARCHAR(50) PRIMARY KEY,
-                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """))
-
-        db.session.execute(text("""
-            INSERT OR IGNORE INTO schema_migrations (version, applied_at)
-            VALUES (:version, :now)
-        """), {
-            'version': MIGRATION_VERSION,
-            'now': datetime.utcnow()
-        })
-
-        db.session.commit()
+        # Create the migration tracking table and record the version
+        _execute_statements(db, _MARK_MIGRATION_COMPLETE_DDL)
         logger.debug(f"✅ Marked migration {MIGRATION_VERSION} as complete")
 
     except Exception as e:
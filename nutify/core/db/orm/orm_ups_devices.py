@@ -5,15 +5,39 @@ This module defines the SQLAlchemy ORM model for the ups_devices table,
 which stores configuration for multiple UPS devices.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime
-from datetime import datetime
-import pytz
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, select, event
+from datetime import datetime, timezone
+from functools import partial
 import json
 
+# orjson is optional; fall back to the standard library when it is not installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = lambda obj: orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+_UTC = timezone.utc
+
+# Current time as an aware UTC datetime (column default/onupdate)
+_utcnow = partial(datetime.now, _UTC)
+
+
 # These will be set during initialization
 db = None
 logger = None
 
+# name -> id map used by get_by_name; rows are resolved through the session's
+# identity map, and the map is cleared whenever devices are created, updated or deleted
+_id_by_name = {}
+
+# Listing statements, built once in init_model so every call reuses the same
+# statement object and hits SQLAlchemy's compiled-query cache
+_select_all = None
+_select_all_enabled = None
+
 
 class UPSDevice:
     """
@@ -23,6 +47,9 @@ class UPSDevice:
     """
     __tablename__ = 'ups_devices'
 
+    # Names of the mapped columns, filled in by init_model once the table exists
+    _COLUMN_NAMES = frozenset()
+
     # Primary key
     id = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -62,22 +89,40 @@ class UPSDevice:
     order_index = Column(Integer, default=0)
 
     # Timestamps
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(pytz.UTC))
-    updated_at = Column(DateTime(timezone=True),
-                      default=lambda: datetime.now(pytz.UTC),
-                      onupdate=lambda: datetime.now(pytz.UTC))
+    created_at = Column(DateTime(timezone=True), default=_utcnow)
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
     last_seen_at = Column(DateTime(timezone=True))
 
     def __init__(self, *args, **kwargs):
+        self._dict_cache = None
         super().__init__(*args, **kwargs)
         if logger:
             logger.debug(f"🆕 Creating UPS Device: {self.name}")
 
+    def __setattr__(self, key, value):
+        # Any assignment to a public (mapped) attribute invalidates the cached to_dict()
+        if not key.startswith('_'):
+            object.__setattr__(self, '_dict_cache', None)
+        super().__setattr__(key, value)
+
     def __repr__(self):
         return f"<UPSDevice(id={self.id}, name='{self.name}', friendly_name='{self.friendly_name}', enabled={self.is_enabled})>"
 
     def to_dict(self):
-        """Convert model to dictionary representation."""
+        """
+        Convert model to dictionary representation.
+
+        The dictionary is built once and reused until an attribute is assigned
+        or the instance is expired/refreshed from the database.
+        """
+        cache = getattr(self, '_dict_cache', None)
+        if cache is None:
+            cache = self._build_dict()
+            object.__setattr__(self, '_dict_cache', cache)
+        return dict(cache)
+
+    def _build_dict(self):
+        """Build the dictionary representation cached by to_dict()."""
         return {
             'id': self.id,
             'name': self.name,
@@ -105,12 +150,12 @@ class UPSDevice:
     @classmethod
     def get_all_enabled(cls):
         """Get all enabled UPS devices, ordered by order_index."""
-        return cls.query.filter_by(is_enabled=True).order_by(cls.order_index).all()
+        return db.session.scalars(_select_all_enabled).all()
 
     @classmethod
     def get_all(cls):
         """Get all UPS devices, ordered by order_index."""
-        return cls.query.order_by(cls.order_index).all()
+        return db.session.scalars(_select_all).all()
 
     @classmethod
     def get_primary(cls):
@@ -124,18 +169,26 @@ class UPSDevice:
     @classmethod
     def get_by_name(cls, name):
         """Get UPS device by name."""
-        return cls.query.filter_by(name=name).first()
+        ups_id = _id_by_name.get(name)
+        if ups_id is not None:
+            device = db.session.get(cls, ups_id)
+            if device is not None and device.name == name:
+                return device
+
+        device = cls.query.filter_by(name=name).first()
+        if device is not None:
+            _id_by_name[name] = device.id
+        return device
 
     @classmethod
     def get_by_id(cls, ups_id):
         """Get UPS device by ID."""
-        return cls.query.filter_by(id=ups_id).first()
+        return db.session.get(cls, ups_id)
 
     def update_last_seen(self):
         """Update the last_seen_at timestamp."""
-        from core.db.ups import db as app_db
-        self.last_seen_at = datetime.now(pytz.UTC)
-        app_db.session.commit()
+        self.last_seen_at = _utcnow()
+        db.session.commit()
         if logger:
             logger.debug(f"✅ Updated last_seen for UPS {self.name}")
 
@@ -144,7 +197,7 @@ class UPSDevice:
         if not self.driver_options:
             return {}
         try:
-            return json.loads(self.driver_options)
+            return _json_loads(self.driver_options)
         except Exception as e:
             if logger:
                 logger.error(f"❌ Error parsing driver_options for UPS {self.name}: {str(e)}")
@@ -153,7 +206,7 @@ class UPSDevice:
     def set_driver_options_dict(self, options_dict):
         """Convert dictionary to JSON string and store in driver_options."""
         try:
-            self.driver_options = json.dumps(options_dict)
+            self.driver_options = _json_dumps(options_dict)
         except Exception as e:
             if logger:
                 logger.error(f"❌ Error setting driver_options for UPS {self.name}: {str(e)}")
@@ -170,11 +223,10 @@ class UPSDevice:
             UPSDevice: The created device
         """
         try:
-            from core.db.ups import db as app_db
-
             new_device = cls(**kwargs)
-            app_db.session.add(new_device)
-            app_db.session.commit()
+            db.session.add(new_device)
+            db.session.commit()
+            _id_by_name.clear()
 
             if logger:
                 logger.info(f"✅ Created new UPS device: {new_device.name}")
@@ -183,7 +235,7 @@ class UPSDevice:
 
         except Exception as e:
             try:
-                app_db.session.rollback()
+                db.session.rollback()
             except:
                 pass
             if logger:
@@ -203,18 +255,18 @@ class UPSDevice:
             UPSDevice: The updated device
         """
         try:
-            from core.db.ups import db as app_db
-
             device = cls.get_by_id(ups_id)
             if not device:
                 raise ValueError(f"UPS device with ID {ups_id} not found")
 
+            column_names = cls._COLUMN_NAMES
             for key, value in kwargs.items():
-                if hasattr(device, key):
+                if key in column_names:
                     setattr(device, key, value)
 
-            device.updated_at = datetime.now(pytz.UTC)
-            app_db.session.commit()
+            device.updated_at = _utcnow()
+            db.session.commit()
+            _id_by_name.clear()
 
             if logger:
                 logger.info(f"✅ Updated UPS device: {device.name}")
@@ -223,7 +275,7 @@ class UPSDevice:
 
         except Exception as e:
             try:
-                app_db.session.rollback()
+                db.session.rollback()
             except:
                 pass
             if logger:
@@ -239,11 +291,12 @@ class UPSDevice:
             ups_id: ID of the UPS device
         """
         try:
-            from core.db.ups import db as app_db
-
-            # Ensure we're not deleting the only device
-            total_devices = cls.query.count()
-            if total_devices <= 1:
+            # Ensure we're not deleting the only device: any other row will do,
+            # so probe for one instead of counting the whole table
+            other_device = db.session.execute(
+                select(cls.id).where(cls.id != ups_id).limit(1)
+            ).scalar()
+            if other_device is None:
                 raise ValueError("Cannot delete the only UPS device")
 
             device = cls.get_by_id(ups_id)
@@ -251,15 +304,16 @@ class UPSDevice:
                 raise ValueError(f"UPS device with ID {ups_id} not found")
 
             device_name = device.name
-            app_db.session.delete(device)
-            app_db.session.commit()
+            db.session.delete(device)
+            db.session.commit()
+            _id_by_name.clear()
 
             if logger:
                 logger.info(f"✅ Deleted UPS device: {device_name}")
 
         except Exception as e:
             try:
-                app_db.session.rollback()
+                db.session.rollback()
             except:
                 pass
             if logger:
@@ -267,6 +321,11 @@ class UPSDevice:
             raise
 
 
+def _clear_dict_cache(target, *args):
+    """Instance event hook: discard the cached to_dict() of a UPS device."""
+    object.__setattr__(target, '_dict_cache', None)
+
+
 def init_model(model_base, db_logger=None):
     """
     Initialize the ORM model for UPS devices.
@@ -278,14 +337,32 @@ def init_model(model_base, db_logger=None):
     Returns:
         class: Initialized UPSDeviceModel class
     """
-    global db, logger
+    global db, logger, _select_all, _select_all_enabled
 
     # Set the database logger
     from core.logger import database_logger
     logger = database_logger
 
+    # Bind the shared database instance once, instead of importing it per call
+    from core.db.ups import db as app_db
+    db = app_db
+
     class UPSDeviceModel(model_base, UPSDevice):
         """ORM model for UPS devices"""
         __table_args__ = {'extend_existing': True}
 
+    UPSDeviceModel._COLUMN_NAMES = frozenset(c.name for c in UPSDeviceModel.__table__.columns)
+
+    # Values reloaded from the database bypass __setattr__, so drop the cached
+    # to_dict() whenever SQLAlchemy expires or refreshes an instance
+    event.listen(UPSDeviceModel, 'expire', _clear_dict_cache)
+    event.listen(UPSDeviceModel, 'refresh', _clear_dict_cache)
+
+    _select_all = select(UPSDeviceModel).order_by(UPSDeviceModel.order_index)
+    _select_all_enabled = (
+        select(UPSDeviceModel)
+        .where(UPSDeviceModel.is_enabled.is_(True))
+        .order_by(UPSDeviceModel.order_index)
+    )
+
     return UPSDeviceModel
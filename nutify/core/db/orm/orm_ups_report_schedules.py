@@ -42,6 +42,8 @@ class ReportSchedule:
                 if report and report not in reports:
                     reports.append(report)
         
+        # Read the timezone once for the four conversions below
+        tz = current_app.CACHE_TIMEZONE
         return {
             'id': self.id,
             'time': self.time,
@@ -50,11 +52,11 @@ class ReportSchedule:
             'email': self.email,
             'mail_config_id': self.mail_config_id,
             'period_type': self.period_type,
-            'from_date': utc_to_local(self.from_date).isoformat() if self.from_date else None,
-            'to_date': utc_to_local(self.to_date).isoformat() if self.to_date else None,
+            'from_date': utc_to_local(self.from_date, tz).isoformat() if self.from_date else None,
+            'to_date': utc_to_local(self.to_date, tz).isoformat() if self.to_date else None,
             'enabled': self.enabled,
-            'created_at': utc_to_local(self.created_at).isoformat() if self.created_at else None,
-            'updated_at': utc_to_local(self.updated_at).isoformat() if self.updated_at else None
+            'created_at': utc_to_local(self.created_at, tz).isoformat() if self.created_at else None,
+            'updated_at': utc_to_local(self.updated_at, tz).isoformat() if self.updated_at else None
         }
     
     @classmethod
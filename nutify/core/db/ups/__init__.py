@@ -19,7 +19,7 @@ from core.db.ups.errors import (
 )
 from core.db.ups.utils import (
     UPSData, configure_ups, get_supported_value, 
-    calculate_realpower, data_lock, ups_lock
+    calculate_realpower, calculate_realpower_bulk, data_lock, ups_lock
 )
 from core.db.ups.data import (
     get_available_variables, get_ups_data, get_historical_data,
@@ -147,6 +147,7 @@ __all__ = [
     'configure_ups',
     'get_supported_value',
     'calculate_realpower',
+    'calculate_realpower_bulk',
     'get_available_variables',
     'get_ups_data',
     'get_historical_data',
@@ -5,7 +5,19 @@ This module provides functions to aggregate metrics from multiple UPS devices
 into a unified view for the dashboard.
 """
 
+import math
+from functools import partial
+from itertools import product
+from operator import itemgetter
+
+import numpy as np
+
 from core.logger import database_logger as logger
+from core.db.ups.aggregator_kernel import NUMBA_AVAILABLE, aggregate_kernel
+
+# Fleet size from which the numeric reductions switch to NumPy; below this the
+# array conversion costs more than the plain Python loop
+_NUMPY_MIN_DEVICES = 16
 
 
 # Status priority for determining worst case (higher number = worse)
@@ -21,35 +33,105 @@ STATUS_PRIORITY = {
     'UNKNOWN': 0      # Unknown status
 }
 
+_STATUS_KEYS = frozenset(STATUS_PRIORITY)
+_MAX_PRIORITY = max(STATUS_PRIORITY.values())
 
-def get_status_priority(status):
+# Single-word statuses are matched per token; multi-word entries such as
+# 'OB DISCHRG' match when all of their tokens are present in the status
+_TOKEN_PRIORITY = {key: prio for key, prio in STATUS_PRIORITY.items() if ' ' not in key}
+_COMPOSITE_PRIORITY = tuple(
+    (frozenset(key.split()), prio) for key, prio in STATUS_PRIORITY.items() if ' ' in key
+)
+
+
+def _compute_status_priority(status):
     """
-    Get priority value for a UPS status string.
+    Uncached priority computation behind get_status_priority().
 
     Args:
-        status: UPS status string (e.g., 'OL', 'OB DISCHRG')
-
-    Returns:
-        int: Priority value (higher = worse)
+        status: Status string already upper-cased and stripped
     """
     if not status:
         return STATUS_PRIORITY['UNKNOWN']
 
-    status = status.upper().strip()
-
     # Check for exact matches first
-    if status in STATUS_PRIORITY:
+    if status in _STATUS_KEYS:
         return STATUS_PRIORITY[status]
 
-    # Check for composite status (e.g., "OL CHRG")
+    # Check for composite status (e.g., "OL CHRG"): one dict lookup per token
+    tokens = status.split()
     max_priority = 0
-    for key in STATUS_PRIORITY:
-        if key in status:
-            max_priority = max(max_priority, STATUS_PRIORITY[key])
+    for token in tokens:
+        priority = _TOKEN_PRIORITY.get(token, 0)
+        if priority > max_priority:
+            max_priority = priority
+
+    if _COMPOSITE_PRIORITY:
+        token_set = frozenset(tokens)
+        for key_tokens, priority in _COMPOSITE_PRIORITY:
+            if priority > max_priority and key_tokens <= token_set:
+                max_priority = priority
 
     return max_priority if max_priority > 0 else STATUS_PRIORITY['UNKNOWN']
 
 
+# (priority, online) per raw status string. It is pre-seeded with every known
+# status and every two-part composite; other statuses are classified on first
+# sight. UPS statuses come from a small alphabet, so the size cap only guards
+# against unexpected free-form values.
+_STATUS_TABLE_MAX = 256
+_STATUS_TABLE = {}
+
+# Status tokens that mark a UPS as online
+_ONLINE_TOKENS = frozenset(('OL', 'CHRG'))
+
+
+def _classify_status(status):
+    """
+    Classify a raw status string missing from _STATUS_TABLE.
+
+    The status is upper-cased once and both the priority and the online flag
+    are derived from that normalized form.
+
+    Returns:
+        tuple: (priority, online)
+    """
+    normalized = status.upper().strip() if status else ''
+    entry = (
+        _compute_status_priority(normalized),
+        not _ONLINE_TOKENS.isdisjoint(normalized.split()),
+    )
+    if len(_STATUS_TABLE) < _STATUS_TABLE_MAX:
+        _STATUS_TABLE[status] = entry
+    return entry
+
+
+def _lookup_status(status):
+    """Return (priority, online) for a raw status string."""
+    return _STATUS_TABLE.get(status) or _classify_status(status)
+
+
+def get_status_priority(status):
+    """
+    Get priority value for a UPS status string.
+
+    Args:
+        status: UPS status string (e.g., 'OL', 'OB DISCHRG')
+
+    Returns:
+        int: Priority value (higher = worse)
+    """
+    return _lookup_status(status)[0]
+
+
+# Seed the table with every known status and every two-part composite
+for _status in STATUS_PRIORITY:
+    _classify_status(_status)
+for _first, _second in product(STATUS_PRIORITY, repeat=2):
+    _classify_status(f"{_first} {_second}")
+del _status, _first, _second
+
+
 def get_worst_status(statuses):
     """
     Determine the worst status from a list of UPS statuses.
@@ -63,14 +145,16 @@ def get_worst_status(statuses):
     if not statuses:
         return 'UNKNOWN'
 
-    worst_status = statuses[0]
-    worst_priority = get_status_priority(worst_status)
-
-    for status in statuses[1:]:
+    # Keep the first of equally bad statuses; nothing can beat _MAX_PRIORITY
+    worst_status = 'UNKNOWN'
+    worst_priority = -1
+    for status in statuses:
         priority = get_status_priority(status)
         if priority > worst_priority:
-            worst_priority = priority
             worst_status = status
+            worst_priority = priority
+            if priority >= _MAX_PRIORITY:
+                break
 
     return worst_status
 
@@ -86,6 +170,12 @@ def safe_float(value, default=0.0):
     Returns:
         float: Converted value or default
     """
+    # Fast path for the common input types, skipping the try/except setup
+    value_type = type(value)
+    if value_type is float:
+        return value
+    if value_type is int:
+        return float(value)
     if value is None:
         return default
 
@@ -117,88 +207,164 @@ def safe_get(data, key, default=None):
         return default
 
 
-def aggregate_ups_data(all_ups_data):
+# Aggregated fields under their canonical (underscore) names, in the order
+# returned by _extract_metrics(); fetched in one C-level call when all present
+_METRIC_KEYS = (
+    'ups_status', 'ups_realpower', 'ups_load', 'battery_charge',
+    'battery_runtime', 'input_voltage', 'output_voltage',
+)
+_get_metrics = itemgetter(*_METRIC_KEYS)
+
+# Sentinel telling a missing key apart from a key holding None
+_MISSING = object()
+
+
+def _probe_metrics(get):
     """
-    Combine metrics from multiple UPS devices into a unified view.
+    Fetch the aggregated fields one by one when some canonical keys are missing.
 
-    This function implements the aggregation strategy:
-    - Status: Worst case (OB DISCHRG > OB > LB > RB > CHRG > OL)
-    - Power: Sum of all UPS real power
-    - Load: Average load percentage
-    - Battery: Average battery charge
-    - Runtime: Minimum runtime (system limited by shortest)
-    - Voltage: Average input/output voltages
-    - Counts: Total UPS and online count
+    Each field is probed under its canonical underscore name and only falls
+    back to its dotted NUT name when the canonical one is missing.
 
     Args:
-        all_ups_data: Dictionary of {ups_id: UPSData} or list of UPSData objects
+        get: get(key, default) callable over the UPS data
 
     Returns:
-        dict: Aggregated UPS data
+        tuple: Raw field values in _METRIC_KEYS order
     """
-    # Convert to list if dict
-    if isinstance(all_ups_data, dict):
-        ups_list = list(all_ups_data.values())
+    status = get('ups_status', _MISSING)
+    if status is _MISSING:
+        status = get('ups.status', 'UNKNOWN')
+    realpower = get('ups_realpower', _MISSING)
+    if realpower is _MISSING:
+        realpower = get('ups.realpower', 0)
+    load = get('ups_load', _MISSING)
+    if load is _MISSING:
+        load = get('ups.load', 0)
+    battery_charge = get('battery_charge', _MISSING)
+    if battery_charge is _MISSING:
+        battery_charge = get('battery.charge', 0)
+    runtime = get('battery_runtime', _MISSING)
+    if runtime is _MISSING:
+        runtime = get('battery.runtime', 0)
+    input_voltage = get('input_voltage', _MISSING)
+    if input_voltage is _MISSING:
+        input_voltage = get('input.voltage', 0)
+    output_voltage = get('output_voltage', _MISSING)
+    if output_voltage is _MISSING:
+        output_voltage = get('output.voltage', 0)
+
+    return status, realpower, load, battery_charge, runtime, input_voltage, output_voltage
+
+
+def _extract_metrics(ups_data):
+    """
+    Read the aggregated metrics from one UPS data object in a single pass.
+
+    UPSData is a dict, and other attribute objects are read through their
+    instance __dict__, so every field is a plain dict probe. When all canonical keys are present
+    (the normal shape of polled UPSData) they are fetched with a single
+    itemgetter call; otherwise each field is probed with its dotted-name
+    fallback.
+
+    Args:
+        ups_data: UPS data object (dict-like or object with attributes)
+
+    Returns:
+        tuple: (status, realpower, load, battery_charge, runtime,
+                input_voltage, output_voltage)
+    """
+    if isinstance(ups_data, dict):
+        fields = ups_data
+    elif hasattr(ups_data, '__dict__'):
+        fields = vars(ups_data)
     else:
-        ups_list = list(all_ups_data) if all_ups_data else []
+        fields = None
 
-    if not ups_list:
-        logger.warning("⚠️ No UPS data to aggregate")
-        return {
-            'ups_status': 'UNKNOWN',
-            'ups_realpower': 0.0,
-            'ups_load': 0.0,
-            'battery_charge': 0.0,
-            'battery_runtime': 0.0,
-            'input_voltage': 0.0,
-            'output_voltage': 0.0,
-            'ups_count': 0,
-            'ups_online_count': 0
-        }
+    if fields is None:
+        values = _probe_metrics(partial(getattr, ups_data))
+    else:
+        try:
+            values = _get_metrics(fields)
+        except KeyError:
+            values = _probe_metrics(fields.get)
+
+    status, realpower, load, battery_charge, runtime, input_voltage, output_voltage = values
+    return (
+        status,
+        safe_float(realpower),
+        safe_float(load),
+        safe_float(battery_charge),
+        safe_float(runtime),
+        safe_float(input_voltage),
+        safe_float(output_voltage),
+    )
+
+
+_floor = math.floor
+_isfinite = math.isfinite
+
+
+def _quantize(value, scale):
+    """Round half up to 1/scale (e.g. scale=10 for one decimal) without round()."""
+    # NaN and infinities have no floor; they pass through unchanged
+    if not _isfinite(value):
+        return value
+    return _floor(value * scale + 0.5) / scale
+
+
+def _exact_sum(values):
+    """
+    Sum floats with math.fsum so the total does not depend on fleet size or order.
 
-    # Initialize aggregation variables
-    statuses = []
-    total_realpower = 0.0
+    Falls back to a plain sum when fsum rejects non-finite inputs.
+    """
+    try:
+        return math.fsum(values)
+    except (ValueError, OverflowError):
+        return sum(values)
+
+
+def _reduce_metrics(metrics):
+    """
+    Reduce per-UPS numeric metrics with a plain Python loop.
+
+    Args:
+        metrics: Sequence of (realpower, load, battery_charge, runtime,
+                 input_voltage, output_voltage) rows
+
+    Returns:
+        tuple: (total_realpower, avg_load, avg_battery_charge, min_runtime,
+                avg_input_voltage, avg_output_voltage); min_runtime is None
+                when no UPS reports a runtime
+    """
+    realpowers = []
     total_load = 0.0
     total_battery_charge = 0.0
     total_input_voltage = 0.0
     total_output_voltage = 0.0
     min_runtime = None
 
-    online_count = 0
     load_count = 0
     battery_count = 0
     input_voltage_count = 0
     output_voltage_count = 0
 
-    # Aggregate data from all UPS devices
-    for ups_data in ups_list:
-        # Status
-        status = safe_get(ups_data, 'ups_status', safe_get(ups_data, 'ups.status', 'UNKNOWN'))
-        statuses.append(status)
-
-        # Count online devices (OL or CHRG indicates online)
-        if status and ('OL' in status.upper() or 'CHRG' in status.upper()):
-            online_count += 1
-
-        # Real power (sum)
-        realpower = safe_float(safe_get(ups_data, 'ups_realpower', safe_get(ups_data, 'ups.realpower', 0)))
-        total_realpower += realpower
+    for realpower, load, battery_charge, runtime, input_voltage, output_voltage in metrics:
+        # Real power (summed exactly below)
+        realpowers.append(realpower)
 
         # Load percentage (for averaging)
-        load = safe_float(safe_get(ups_data, 'ups_load', safe_get(ups_data, 'ups.load', 0)))
         if load > 0:
             total_load += load
             load_count += 1
 
         # Battery charge (for averaging)
-        battery_charge = safe_float(safe_get(ups_data, 'battery_charge', safe_get(ups_data, 'battery.charge', 0)))
         if battery_charge > 0:
             total_battery_charge += battery_charge
             battery_count += 1
 
         # Battery runtime (minimum)
-        runtime = safe_float(safe_get(ups_data, 'battery_runtime', safe_get(ups_data, 'battery.runtime', 0)))
         if runtime > 0:
             if min_runtime is None:
                 min_runtime = runtime
@@ -206,61 +372,241 @@ def aggregate_ups_data(all_ups_data):
                 min_runtime = min(min_runtime, runtime)
 
         # Input voltage (for averaging)
-        input_voltage = safe_float(safe_get(ups_data, 'input_voltage', safe_get(ups_data, 'input.voltage', 0)))
         if input_voltage > 0:
             total_input_voltage += input_voltage
             input_voltage_count += 1
 
         # Output voltage (for averaging)
-        output_voltage = safe_float(safe_get(ups_data, 'output_voltage', safe_get(ups_data, 'output.voltage', 0)))
         if output_voltage > 0:
             total_output_voltage += output_voltage
             output_voltage_count += 1
 
+    return (
+        _exact_sum(realpowers),
+        (total_load / load_count) if load_count > 0 else 0.0,
+        (total_battery_charge / battery_count) if battery_count > 0 else 0.0,
+        min_runtime,
+        (total_input_voltage / input_voltage_count) if input_voltage_count > 0 else 0.0,
+        (total_output_voltage / output_voltage_count) if output_voltage_count > 0 else 0.0,
+    )
+
+
+def _positive_mean(column):
+    """Mean of the positive entries of a NumPy column, 0.0 if there are none."""
+    positive = column[column > 0]
+    return float(positive.mean()) if positive.size else 0.0
+
+
+def _reduce_metrics_numpy(metrics):
+    """
+    NumPy variant of _reduce_metrics() for large fleets.
+
+    The rows are converted to one float64 matrix and every reduction runs as
+    a vectorized column operation. Returns the same tuple as _reduce_metrics().
+    """
+    realpower, load, battery_charge, runtime, input_voltage, output_voltage = (
+        np.array(metrics, dtype=np.float64).T
+    )
+
+    positive_runtime = runtime[runtime > 0]
+    min_runtime = float(positive_runtime.min()) if positive_runtime.size else None
+
+    return (
+        _exact_sum(realpower.tolist()),
+        _positive_mean(load),
+        _positive_mean(battery_charge),
+        min_runtime,
+        _positive_mean(input_voltage),
+        _positive_mean(output_voltage),
+    )
+
+
+def _reduce_metrics_kernel(metrics):
+    """
+    JIT variant of _reduce_metrics() used when numba is installed.
+
+    The rows are transposed into contiguous per-metric float64 arrays and
+    reduced in a single compiled pass; the power total is summed exactly
+    outside the kernel so the kernel is free to reassociate. Returns the same
+    tuple as _reduce_metrics().
+    """
+    columns = np.array(metrics, dtype=np.float64).T.copy()
+    (total_load, load_count, total_battery_charge, battery_count,
+     min_runtime, total_input_voltage, input_voltage_count,
+     total_output_voltage, output_voltage_count) = aggregate_kernel(*columns[1:])
+
+    return (
+        _exact_sum(columns[0].tolist()),
+        (total_load / load_count) if load_count > 0 else 0.0,
+        (total_battery_charge / battery_count) if battery_count > 0 else 0.0,
+        float(min_runtime) if not math.isinf(min_runtime) else None,
+        (total_input_voltage / input_voltage_count) if input_voltage_count > 0 else 0.0,
+        (total_output_voltage / output_voltage_count) if output_voltage_count > 0 else 0.0,
+    )
+
+
+# Key layout of the aggregated result. Copying it and filling the values is
+# cheaper than building the 19-key dict from scratch on every poll.
+_RESULT_TEMPLATE = {
+    # Combined status (worst case); both formats for compatibility
+    'ups_status': None,
+    'ups.status': None,
+
+    # Total power
+    'ups_realpower': None,
+    'ups.realpower': None,
+
+    # Average load
+    'ups_load': None,
+    'ups.load': None,
+
+    # Average battery charge
+    'battery_charge': None,
+    'battery.charge': None,
+
+    # Minimum runtime
+    'battery_runtime': None,
+    'battery.runtime': None,
+
+    # Average voltages
+    'input_voltage': None,
+    'input.voltage': None,
+    'output_voltage': None,
+    'output.voltage': None,
+
+    # Device counts
+    'ups_count': 0,
+    'ups_online_count': 0,
+    'ups_offline_count': 0,
+
+    # Metadata
+    'is_aggregated': True,
+    'source': 'multi_ups_aggregation'
+}
+
+
+def aggregate_ups_data(all_ups_data):
+    """
+    Combine metrics from multiple UPS devices into a unified view.
+
+    This function implements the aggregation strategy:
+    - Status: Worst case (OB DISCHRG > OB > LB > RB > CHRG > OL)
+    - Power: Sum of all UPS real power
+    - Load: Average load percentage
+    - Battery: Average battery charge
+    - Runtime: Minimum runtime (system limited by shortest)
+    - Voltage: Average input/output voltages
+    - Counts: Total UPS and online count
+
+    Args:
+        all_ups_data: Dictionary of {ups_id: UPSData} or list of UPSData objects
+
+    Returns:
+        dict: Aggregated UPS data
+    """
+    aggregated, _ = _aggregate(all_ups_data)
+    return aggregated
+
+
+def _aggregate(all_ups_data, collect_devices=False):
+    """
+    Single pass behind aggregate_ups_data() and aggregate_ups_data_with_details().
+
+    Every UPS is probed once; the per-device summaries are built from the
+    values already extracted for the aggregation.
+
+    Args:
+        all_ups_data: Dictionary of {ups_id: UPSData} or list of UPSData objects
+        collect_devices: Also build per-device summaries (dict input only,
+            since they are keyed by ups_id)
+
+    Returns:
+        tuple: (aggregated dict, list of device summaries)
+    """
+    devices = []
+
+    # Pair every UPS with its id; lists have no ids and yield no summaries
+    if isinstance(all_ups_data, dict):
+        ups_items = list(all_ups_data.items())
+    else:
+        ups_items = [(None, ups_data) for ups_data in all_ups_data] if all_ups_data else []
+        collect_devices = False
+
+    if not ups_items:
+        logger.warning("⚠️ No UPS data to aggregate")
+        return {
+            'ups_status': 'UNKNOWN',
+            'ups_realpower': 0.0,
+            'ups_load': 0.0,
+            'battery_charge': 0.0,
+            'battery_runtime': 0.0,
+            'input_voltage': 0.0,
+            'output_voltage': 0.0,
+            'ups_count': 0,
+            'ups_online_count': 0
+        }, devices
+
+    # Track the worst status and collect the numeric metrics of every UPS device
+    worst_status = 'UNKNOWN'
+    worst_priority = -1
+    metrics = []
+    online_count = 0
+
+    for ups_id, ups_data in ups_items:
+        status, *values = _extract_metrics(ups_data)
+
+        # Status (first of equally bad statuses wins, like get_worst_status)
+        priority, online = _lookup_status(status)
+        if priority > worst_priority:
+            worst_status = status
+            worst_priority = priority
+
+        # Count online devices (OL or CHRG indicates online)
+        online_count += online
+
+        metrics.append(values)
+
+        if collect_devices:
+            realpower, load, battery_charge = values[:3]
+            devices.append({
+                'ups_id': ups_id,
+                'status': status,
+                'battery_charge': battery_charge,
+                'realpower': realpower,
+                'load': load,
+            })
+
     # Calculate aggregated values
-    ups_count = len(ups_list)
-    worst_status = get_worst_status(statuses)
-    avg_load = (total_load / load_count) if load_count > 0 else 0.0
-    avg_battery_charge = (total_battery_charge / battery_count) if battery_count > 0 else 0.0
-    avg_input_voltage = (total_input_voltage / input_voltage_count) if input_voltage_count > 0 else 0.0
-    avg_output_voltage = (total_output_voltage / output_voltage_count) if output_voltage_count > 0 else 0.0
-
-    aggregated = {
-        # Combined status (worst case)
-        'ups_status': worst_status,
-        'ups.status': worst_status,  # Include both formats for compatibility
-
-        # Total power
-        'ups_realpower': round(total_realpower, 2),
-        'ups.realpower': round(total_realpower, 2),
-
-        # Average load
-        'ups_load': round(avg_load, 1),
-        'ups.load': round(avg_load, 1),
-
-        # Average battery charge
-        'battery_charge': round(avg_battery_charge, 1),
-        'battery.charge': round(avg_battery_charge, 1),
-
-        # Minimum runtime
-        'battery_runtime': round(min_runtime, 0) if min_runtime is not None else 0,
-        'battery.runtime': round(min_runtime, 0) if min_runtime is not None else 0,
-
-        # Average voltages
-        'input_voltage': round(avg_input_voltage, 1),
-        'input.voltage': round(avg_input_voltage, 1),
-        'output_voltage': round(avg_output_voltage, 1),
-        'output.voltage': round(avg_output_voltage, 1),
-
-        # Device counts
-        'ups_count': ups_count,
-        'ups_online_count': online_count,
-        'ups_offline_count': ups_count - online_count,
-
-        # Metadata
-        'is_aggregated': True,
-        'source': 'multi_ups_aggregation'
-    }
+    ups_count = len(ups_items)
+    if ups_count >= _NUMPY_MIN_DEVICES and NUMBA_AVAILABLE:
+        reduced = _reduce_metrics_kernel(metrics)
+    elif ups_count >= _NUMPY_MIN_DEVICES:
+        reduced = _reduce_metrics_numpy(metrics)
+    else:
+        reduced = _reduce_metrics(metrics)
+    (total_realpower, avg_load, avg_battery_charge, min_runtime,
+     avg_input_voltage, avg_output_voltage) = reduced
+
+    # Quantize each value once and share it between both key formats
+    realpower = _quantize(total_realpower, 100)
+    load = _quantize(avg_load, 10)
+    battery_charge = _quantize(avg_battery_charge, 10)
+    runtime = _quantize(min_runtime, 1) if min_runtime is not None else 0
+    input_voltage = _quantize(avg_input_voltage, 10)
+    output_voltage = _quantize(avg_output_voltage, 10)
+
+    # Fill the pre-built key layout; each value is shared by both key formats
+    aggregated = _RESULT_TEMPLATE.copy()
+    aggregated['ups_status'] = aggregated['ups.status'] = worst_status
+    aggregated['ups_realpower'] = aggregated['ups.realpower'] = realpower
+    aggregated['ups_load'] = aggregated['ups.load'] = load
+    aggregated['battery_charge'] = aggregated['battery.charge'] = battery_charge
+    aggregated['battery_runtime'] = aggregated['battery.runtime'] = runtime
+    aggregated['input_voltage'] = aggregated['input.voltage'] = input_voltage
+    aggregated['output_voltage'] = aggregated['output.voltage'] = output_voltage
+    aggregated['ups_count'] = ups_count
+    aggregated['ups_online_count'] = online_count
+    aggregated['ups_offline_count'] = ups_count - online_count
 
     logger.debug(
         f"📊 Aggregated {ups_count} UPS: "
@@ -268,7 +614,7 @@ def aggregate_ups_data(all_ups_data):
         f"battery={avg_battery_charge:.1f}%, online={online_count}/{ups_count}"
     )
 
-    return aggregated
+    return aggregated, devices
 
 
 def aggregate_ups_data_with_details(all_ups_data):
@@ -286,23 +632,7 @@ def aggregate_ups_data_with_details(all_ups_data):
             'devices': List of device summaries
         }
     """
-    # Get basic aggregation
-    aggregated = aggregate_ups_data(all_ups_data)
-
-    # Build device summaries
-    devices = []
-
-    # Convert to list if dict
-    if isinstance(all_ups_data, dict):
-        for ups_id, ups_data in all_ups_data.items():
-            device_summary = {
-                'ups_id': ups_id,
-                'status': safe_get(ups_data, 'ups_status', safe_get(ups_data, 'ups.status', 'UNKNOWN')),
-                'battery_charge': safe_float(safe_get(ups_data, 'battery_charge', safe_get(ups_data, 'battery.charge', 0))),
-                'realpower': safe_float(safe_get(ups_data, 'ups_realpower', safe_get(ups_data, 'ups.realpower', 0))),
-                'load': safe_float(safe_get(ups_data, 'ups_load', safe_get(ups_data, 'ups.load', 0))),
-            }
-            devices.append(device_summary)
+    aggregated, devices = _aggregate(all_ups_data, collect_devices=True)
 
     return {
         'aggregated': aggregated,
@@ -0,0 +1,95 @@
+"""
+UPS Aggregation Kernel Module.
+
+This module provides the single-pass reduction used by the aggregator for
+large multi-UPS fleets. When numba is installed the kernel is JIT-compiled;
+otherwise NUMBA_AVAILABLE is False and the aggregator keeps using its NumPy
+reductions.
+"""
+
+import math
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+# Fast-math flags that still honour NaN/Inf semantics while letting LLVM
+# reassociate and vectorize the accumulations
+FASTMATH_FLAGS = {
+    'nnan': False,
+    'ninf': False,
+    'nsz': True,
+    'arcp': True,
+    'contract': True,
+    'afn': True,
+    'reassoc': True,
+}
+
+
+def _aggregate_kernel(load, battery_charge, runtime, input_voltage, output_voltage):
+    """
+    Reduce the per-UPS metric arrays in one pass.
+
+    Args:
+        load, battery_charge, runtime, input_voltage, output_voltage:
+            Contiguous float64 arrays of equal length (one entry per UPS)
+
+    The real power total is not reduced here: the aggregator sums it with
+    math.fsum, so fast-math reassociation in the kernel cannot affect it.
+
+    Returns:
+        tuple: (sum_load, load_count, sum_battery, battery_count,
+                min_runtime, sum_input_voltage, input_voltage_count,
+                sum_output_voltage, output_voltage_count); min_runtime is +inf
+                when no UPS reports a positive runtime
+    """
+    sum_load = 0.0
+    sum_battery = 0.0
+    sum_input_voltage = 0.0
+    sum_output_voltage = 0.0
+    min_runtime = math.inf
+
+    load_count = 0
+    battery_count = 0
+    input_voltage_count = 0
+    output_voltage_count = 0
+
+    for i in range(load.shape[0]):
+        value = load[i]
+        if value > 0.0:
+            sum_load += value
+            load_count += 1
+
+        value = battery_charge[i]
+        if value > 0.0:
+            sum_battery += value
+            battery_count += 1
+
+        value = runtime[i]
+        if value > 0.0 and value < min_runtime:
+            min_runtime = value
+
+        value = input_voltage[i]
+        if value > 0.0:
+            sum_input_voltage += value
+            input_voltage_count += 1
+
+        value = output_voltage[i]
+        if value > 0.0:
+            sum_output_voltage += value
+            output_voltage_count += 1
+
+    return (
+        sum_load, load_count, sum_battery, battery_count,
+        min_runtime, sum_input_voltage, input_voltage_count,
+        sum_output_voltage, output_voltage_count
+    )
+
+
+if NUMBA_AVAILABLE:
+    aggregate_kernel = njit(cache=True, fastmath=FASTMATH_FLAGS)(_aggregate_kernel)
+else:
+    aggregate_kernel = _aggregate_kernel
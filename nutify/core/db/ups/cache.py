@@ -3,27 +3,365 @@ UPS Data Cache Module.
 This module provides a caching system for UPS data.
 """
 
+import atexit
 import logging
+import math
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import sys
+import itertools
 import threading
+import time
+from collections import deque
 import json
 from flask import current_app
-import pytz
+from sqlalchemy import func
 
 from core.logger import database_logger as logger
 from core.db.ups import db
 from core.db.ups.utils import data_lock
 from core.db.ups.data import get_ups_data, get_all_ups_data
 from core.db.ups.aggregator import aggregate_ups_data
+# Functions are looked up at call time, see core.db.ups.data
+import core.db.internal_checker as internal_checker
 from flask_socketio import SocketIO
+from socketio import packet
 
 # Lock for cache operations
 data_lock = threading.Lock()
 
-# WebSocket instance for cache updates
-websocket = SocketIO()
+# orjson is optional; Socket.IO falls back to the standard library json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    def _encode_json(obj, **kwargs):
+        # orjson output is always compact, so the separators argument is not needed
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+    def _decode_json(s, **kwargs):
+        return orjson.loads(s)
+else:
+    _encode_json = json.dumps
+    _decode_json = json.loads
+
+class _Snapshot(dict):
+    """
+    cache_update payload stamped with a version.
+
+    The version is taken when the snapshot is built; a snapshot must not be
+    changed afterwards, a new one is built instead.
+    """
+    __slots__ = ('version',)
+
+    _versions = itertools.count(1)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = next(self._versions)
+
+class _PacketJSON:
+    """
+    json-compatible module used by Socket.IO to encode packets.
+
+    The last _Snapshot encoded is remembered by event and version: emitting
+    the same snapshot again, as when the latest cache_update is sent to each
+    connecting client, reuses the encoded text instead of serializing it
+    once per client. Other payloads are always encoded.
+    """
+    _last = (None, None)  # ((event, version), encoded)
+
+    @classmethod
+    def dumps(cls, obj, **kwargs):
+        if type(obj) is list and len(obj) == 2 and type(obj[1]) is _Snapshot:
+            key = (obj[0], obj[1].version)
+            last_key, encoded = cls._last
+            if key == last_key:
+                return encoded
+            encoded = _encode_json(obj, **kwargs)
+            cls._last = (key, encoded)
+            return encoded
+        return _encode_json(obj, **kwargs)
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return _decode_json(s, **kwargs)
+
+class _CachePacket(packet.Packet):
+    """Socket.IO packet class of the cache WebSocket, using _PacketJSON."""
+    json = _PacketJSON
+
+# WebSocket instance for cache updates; every packet is serialized once per emit.
+# The encoder is set on a Packet subclass: SocketIO(json=...) would assign it to
+# the shared Packet class and so to every Socket.IO server in the process.
+websocket = SocketIO(serializer=_CachePacket)
+
+# Window (seconds) during which WebSocket updates are coalesced into one emit
+BROADCAST_FLUSH_DELAY = 0.1
+
+# Clients addressed per emit before yielding to other green threads
+BROADCAST_BATCH_SIZE = 50
+
+# Minimum spacing between emits grows by this many seconds per tenfold
+# increase in connected clients, up to BROADCAST_MAX_INTERVAL
+BROADCAST_INTERVAL_PER_DECADE = 1.0
+BROADCAST_MAX_INTERVAL = 5.0
+
+# Seconds a connected-clients check is reused; connect/disconnect invalidate it
+CLIENT_CHECK_TTL = 1.0
+
+# Averaged rows are queued and written in one executemany once
+# WRITE_BATCH_SIZE rows are pending or the oldest has waited
+# WRITE_FLUSH_INTERVAL seconds; rows still queued are written at exit
+WRITE_BATCH_SIZE = 5
+WRITE_FLUSH_INTERVAL = 10
+
+# Rows kept for retry while the database cannot be written (oldest dropped)
+WRITE_BUFFER_MAX = 60
+
+# Metrics whose change of at least 1 unit (1% or 1W) triggers a broadcast
+CHANGE_METRICS = ('ups_load', 'battery_charge', 'ups_realpower', 'input_voltage')
+
+def _metric_float(value):
+    """
+    Convert a metric value for change detection.
+
+    Returns:
+        float: Value as float (falsy values count as 0.0), or None if the
+        value cannot be compared
+    """
+    if type(value) is float:
+        return value
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def _metric_floats(data):
+    """Return {metric: float or None} for the change metrics present in data."""
+    return {metric: _metric_float(data[metric]) for metric in CHANGE_METRICS if metric in data}
+
+def _has_significant_change(data, last_floats):
+    """
+    Check whether any change metric moved by at least 1 since the last broadcast.
+
+    Values that cannot be compared count as a change.
+
+    Args:
+        data (dict): Data about to be broadcast
+        last_floats (dict): _metric_floats() of the last broadcast
+
+    Returns:
+        bool: True if the change is significant
+    """
+    for metric, last_value in last_floats.items():
+        if metric not in data:
+            continue
+        value = data[metric]
+        if type(value) is not float:
+            value = _metric_float(value)
+        if value is None or last_value is None or abs(value - last_value) >= 1.0:
+            return True
+    return False
+
+def _clients_connected():
+    """
+    Check whether any client is connected to the cache WebSocket.
+
+    Returns:
+        bool: True if at least one client is connected to the default namespace
+    """
+    if websocket.server is None:
+        return False
+    for _ in websocket.server.manager.get_participants('/', None):
+        return True
+    return False
+
+def _broadcast_interval(client_count):
+    """
+    Minimum time between emits for the given audience size.
+
+    A single client gets every update; larger audiences get updates coalesced
+    over a window that grows with the logarithm of the client count.
+
+    Args:
+        client_count (int): Number of connected clients
+
+    Returns:
+        float: Interval in seconds
+    """
+    if client_count <= 1:
+        return 0.0
+    return min(BROADCAST_INTERVAL_PER_DECADE * math.log10(client_count), BROADCAST_MAX_INTERVAL)
+
+def _emit_to_clients(event, payload):
+    """
+    Emit an event to every connected client, in batches for large audiences.
+
+    Up to BROADCAST_BATCH_SIZE clients get a plain broadcast. Above that the
+    session IDs are addressed in slices and the event loop is yielded between
+    slices, so a large fan-out does not stall data collection.
+
+    Args:
+        event (str): WebSocket event name
+        payload (dict): Data to emit
+
+    Returns:
+        int: Number of clients addressed
+    """
+    sids = [sid for sid, _ in websocket.server.manager.get_participants('/', None)]
+    if len(sids) <= BROADCAST_BATCH_SIZE:
+        websocket.emit(event, payload)
+        return len(sids)
+
+    for start in range(0, len(sids), BROADCAST_BATCH_SIZE):
+        websocket.emit(event, payload, to=sids[start:start + BROADCAST_BATCH_SIZE])
+        websocket.sleep(0)
+    return len(sids)
+
+# Formatted, interned key tuples indexed by the raw key layout of a sample.
+# Every poll of a UPS reports the same keys in the same order, so the layout
+# is formatted once and each buffered sample shares the same key objects.
+_KEY_LAYOUTS_MAX = 64
+_KEY_LAYOUTS = {}
+
+def _format_keys(data):
+    """
+    Convert NUT dot-notation keys to the underscore format used by the database.
+
+    Args:
+        data (dict): UPS data dictionary
+
+    Returns:
+        dict: Copy of data with '.' replaced by '_' in every key
+    """
+    layout = tuple(data)
+    keys = _KEY_LAYOUTS.get(layout)
+    if keys is None:
+        keys = tuple(sys.intern(key.replace('.', '_')) for key in layout)
+        if len(_KEY_LAYOUTS) < _KEY_LAYOUTS_MAX:
+            _KEY_LAYOUTS[layout] = keys
+    return dict(zip(keys, data.values()))
+
+def bulk_insert_rows(db, table, rows):
+    """
+    Insert rows into a table with one executemany in a single transaction.
+
+    The rows are passed to a Core INSERT as a list of mappings, so SQLAlchemy
+    batches them (insertmanyvalues) without building ORM objects. An
+    executemany needs the same keys in every row, so columns missing from
+    some rows are written as NULL.
+
+    Args:
+        db: Database instance
+        table: SQLAlchemy Table to insert into
+        rows (list): Column-value dicts
+    """
+    if not rows:
+        return
+
+    keys = set().union(*rows)
+    if any(len(row) != len(keys) for row in rows):
+        rows = [dict.fromkeys(keys) | row for row in rows]
+
+    with data_lock:
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+def _data_dict(ups_data):
+    """
+    Get the field dict of a UPS data object without copying it.
+
+    Args:
+        ups_data: UPSData object or plain dict
+
+    Returns:
+        dict: The fields of the UPS data
+    """
+    if hasattr(ups_data, 'as_dict'):
+        return ups_data.as_dict()
+    return vars(ups_data) if hasattr(ups_data, '__dict__') else ups_data
+
+def _buffer_to_dataframe(buffer):
+    """
+    Build a DataFrame from a [(timestamp, data_dict), ...] buffer.
+
+    Args:
+        buffer (list): Buffered samples
+
+    Returns:
+        DataFrame: One row per sample with a 'timestamp' column
+    """
+    return pd.DataFrame([{'timestamp': ts, **d} for ts, d in buffer])
+
+class _RunningAverages:
+    """
+    Running per-key sums of the samples in one save window.
+
+    int/float values are summed per key (NaN and None are skipped, like
+    Pandas' mean); a key that ever carries another value type is treated as
+    non-numeric for the rest of the window. The last value of every key is
+    kept for the non-numeric columns.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear the sums when a save window is closed."""
+        self.sums = {}            # {key: sum of numeric values}
+        self.counts = {}          # {key: number of numeric values}
+        self.last_values = {}     # {key: last value seen}
+        self.non_numeric = set()  # Keys that carried a non-numeric value
+
+    def add(self, data):
+        """
+        Fold one sample into the sums.
+
+        Args:
+            data (dict): Formatted sample
+        """
+        sums = self.sums
+        counts = self.counts
+        non_numeric = self.non_numeric
+
+        for key, value in data.items():
+            value_type = type(value)
+            if value_type is float or value_type is int:
+                if value == value and key not in non_numeric:
+                    sums[key] = sums.get(key, 0.0) + value
+                    counts[key] = counts.get(key, 0) + 1
+            elif value is not None:
+                non_numeric.add(key)
+
+        self.last_values.update(data)
+
+    def averages(self):
+        """
+        Return the averages of the numeric keys and the last value of the others.
+
+        Returns:
+            dict: Averages rounded to 2 decimal places and last values, or
+            None if no sample was added
+        """
+        if not self.last_values:
+            return None
+
+        counts = self.counts
+        non_numeric = self.non_numeric
+        averages = {
+            key: round(total / counts[key], 2)
+            for key, total in self.sums.items()
+            if key not in non_numeric
+        }
+        return {
+            **averages,
+            **{key: value for key, value in self.last_values.items() if key not in averages}
+        }
 
 class UPSDataCache:
     """
@@ -44,44 +382,110 @@ class UPSDataCache:
         Args:
             size (int): Size of the buffer in seconds
         """
-        self.size = size
-        self.data = []  # Legacy single-UPS buffer (for backward compatibility)
-        self.df = None
+        self._size = size
+        self.data = deque(maxlen=size)  # Legacy single-UPS buffer (for backward compatibility)
+        self._df = None  # DataFrame of self.data, built on demand
+
+        # Running averages of the current save window
+        self._averages = _RunningAverages()
 
         # Multi-UPS data tracking
-        self.per_ups_data = {}  # {ups_id: [(timestamp, data_dict), ...]}
-        self.per_ups_df = {}    # {ups_id: DataFrame}
-        self.aggregated_data = []  # Buffer for aggregated data
-        self.aggregated_df = None
+        self.per_ups_data = {}  # {ups_id: deque([(timestamp, data_dict), ...])}
+        self._per_ups_df = {}   # {ups_id: DataFrame}, built on demand
+        self.aggregated_data = deque(maxlen=size)  # Buffer for aggregated data
+        self._aggregated_df = None  # DataFrame of self.aggregated_data, built on demand
+        self._per_ups_averages = {}  # {ups_id: _RunningAverages}
+        self._aggregated_averages = _RunningAverages()
 
         self.next_save_time = None
         self.next_hour = None  #  For tracking the next hour
         self.hourly_data = []  # Buffer for hourly data
         self.last_daily_aggregation = None
+        self._daily_scheduler_started = False
+
+        # Averaged rows not yet written and when the next write is due
+        self._pending_rows = deque(maxlen=WRITE_BUFFER_MAX)
+        self._flush_deadline = None
+        self._exit_flush_registered = False
+        self._logged_key_transform = False  # Key format conversion is logged once
 
         # Last broadcasted cache data
         self.last_broadcast = None
         self.last_broadcast_aggregated = None  # Aggregated data
         self.last_broadcast_per_ups = {}       # Per-UPS data
 
+        # Change-metric floats of the last broadcasts, for change detection
+        self._last_broadcast_floats = {}
+        self._last_broadcast_aggregated_floats = {}
+
+        # Updates waiting for the next flush: {event: payload}, latest wins
+        self._pending_broadcasts = {}
+        self._broadcast_lock = threading.Lock()
+        self._flush_scheduled = False
+        self._last_emit_time = 0.0
+        self._emit_interval = 0.0  # Adapted to the client count after each flush
+
+        # Cached connected-clients check and the newest sample not broadcast
+        # because nobody was listening (sent to the next client that connects)
+        self._has_clients_value = None
+        self._has_clients_checked = 0.0
+        self._idle_data = None
+
         cache_seconds = 60  # Fixed value
         logger.info(f"📊 Initialized UPS data cache (size: {size} seconds, cache seconds: {cache_seconds}, multi-UPS support enabled)")
 
+    @property
+    def size(self):
+        """Capacity of the sample buffers."""
+        return self._size
+
+    @size.setter
+    def size(self, size):
+        """Resize the ring buffers, keeping the most recent samples."""
+        self._size = size
+        self.data = deque(self.data, maxlen=size)
+        self.aggregated_data = deque(self.aggregated_data, maxlen=size)
+        self.per_ups_data = {
+            ups_id: deque(buffer, maxlen=size) for ups_id, buffer in self.per_ups_data.items()
+        }
+        self._df = None
+        self._aggregated_df = None
+        self._per_ups_df = {}
+
+    @property
+    def df(self):
+        """DataFrame of the single-UPS buffer, rebuilt only after the buffer changed."""
+        if self._df is None and self.data:
+            self._df = _buffer_to_dataframe(self.data)
+        return self._df
+
+    @property
+    def per_ups_df(self):
+        """Per-UPS DataFrames ({ups_id: DataFrame}), rebuilt only for changed buffers."""
+        for ups_id, buffer in self.per_ups_data.items():
+            if ups_id not in self._per_ups_df:
+                self._per_ups_df[ups_id] = _buffer_to_dataframe(buffer)
+        return self._per_ups_df
+
+    @property
+    def aggregated_df(self):
+        """DataFrame of the aggregated buffer, rebuilt only after the buffer changed."""
+        if self._aggregated_df is None and self.aggregated_data:
+            self._aggregated_df = _buffer_to_dataframe(self.aggregated_data)
+        return self._aggregated_df
+
     def get_next_hour(self, current_time):
         """
         Calculate the exact next hour in UTC for database storage
         
         Args:
-            current_time: Current timestamp
+            current_time: Current timestamp in UTC
             
         Returns:
             datetime: Next hour timestamp in UTC
         """
-        # Create a UTC timestamp directly
-        utc_time = datetime.now(pytz.UTC)
-        
         # Calculate the exact next hour in UTC
-        next_hour_utc = utc_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        next_hour_utc = current_time.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
         
         logger.debug(f"Next hour calculated in UTC: {next_hour_utc}")
         return next_hour_utc
@@ -93,14 +497,96 @@ class UPSDataCache:
         Returns:
             float: Hourly average or None if no data
         """
-        if not self.hourly_data:
-            return None
-            
-        df = pd.DataFrame(self.hourly_data)
-        if 'ups_realpower' not in df.columns:
+        powers = [
+            entry['ups_realpower'] for entry in self.hourly_data
+            if entry.get('ups_realpower') is not None
+        ]
+        if not powers:
             return None
-            
-        return round(df['ups_realpower'].mean(), 2)
+
+        return round(sum(powers) / len(powers), 2)
+
+    def _build_save_row(self, db, UPSDynamicData, averages, utc_now):
+        """
+        Build the ups_dynamic_data row for the current save window.
+
+        Averages whose key is not a column are dropped with a warning. When
+        the hour rolls over, the hourly power average is computed in the
+        database and stored in ups_realpower_hrs.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+            averages (dict): Averaged values of the save window
+            utc_now: Current timestamp in UTC
+
+        Returns:
+            dict: Column values for the new row
+        """
+        # Build the new row as a plain dict of column values
+        table = UPSDynamicData.__table__
+        column_names = set(table.columns.keys())
+
+        # Set timestamp_utc - already in UTC
+        row = {'timestamp_utc': self.next_save_time}
+        logger.info(f"⏰ Setting timestamp_utc to {self.next_save_time} UTC")
+
+        # Summarize the critical fields (formatted only when debug logging is enabled)
+        critical_fields = ('ups_status', 'ups_load', 'ups_realpower', 'ups_realpower_nominal')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Critical fields in averages: %s", {field: averages.get(field) for field in critical_fields})
+
+        # Set the average values
+        missing_keys = []
+        for key, value in averages.items():
+            if key in column_names:
+                row[key] = value
+            else:
+                missing_keys.append(key)
+
+        if missing_keys:
+            logger.warning(f"⚠️ {len(missing_keys)} keys from averages were not in the model: {missing_keys[:5]}...")
+
+        # Add to hourly buffer if ups_realpower is present
+        if 'ups_realpower' in averages:
+            self.hourly_data.append({
+                'timestamp': self.next_save_time,  # Already in UTC
+                'ups_realpower': averages['ups_realpower']
+            })
+
+            # Check if it's time to calculate the hourly average
+            if utc_now >= self.next_hour:
+                exact_hour = self.next_hour - timedelta(hours=1)  # Both in UTC
+
+                logger.info(f"Calculating hourly average for hour ending at {self.next_hour} UTC")
+
+                # The average is read back from the table, so queued rows go first
+                self.flush_pending_rows(db, UPSDynamicData, utc_now)
+
+                # Let the database average the power of the records in the UTC timeframe
+                hourly_avg, record_count = db.session.query(
+                    func.avg(UPSDynamicData.ups_realpower),
+                    func.count(UPSDynamicData.ups_realpower)
+                ).filter(
+                    UPSDynamicData.timestamp_utc >= exact_hour,
+                    UPSDynamicData.timestamp_utc < self.next_hour,
+                    UPSDynamicData.ups_realpower.isnot(None)
+                ).one()
+
+                if hourly_avg is not None:
+                    row['ups_realpower_hrs'] = round(float(hourly_avg), 2)
+                    logger.info(f"📊 Calculated hourly average from {record_count} records: {hourly_avg}W. Saving ups_realpower_hrs = {row['ups_realpower_hrs']}")
+                else:
+                    logger.warning("📊 No power data found in database for hourly average calculation.")
+
+                # Reset for the next hour
+                self.hourly_data = []
+                self.next_hour = self.get_next_hour(utc_now)
+                logger.info(f"Next hourly calculation at: {self.next_hour} UTC")
+            else:
+                logger.debug("⏰ Not yet time for hourly calculation.")
+
+        return row
 
     def calculate_and_save_averages(self, db, UPSDynamicData, current_time):
         """
@@ -109,14 +595,13 @@ class UPSDataCache:
         Args:
             db: Database instance
             UPSDynamicData: UPS dynamic data model class
-            current_time: Current timestamp (not used, we use UTC directly)
+            current_time: Current timestamp in UTC, taken once per poll
             
         Returns:
-            bool: True if data was saved, False otherwise
+            bool: True if a row was queued for saving, False otherwise
         """
         try:
-            # Get current time in UTC for consistency
-            utc_now = datetime.now(pytz.UTC)
+            utc_now = current_time
             
             # Initialize next_hour if necessary
             if self.next_hour is None:
@@ -132,125 +617,178 @@ class UPSDataCache:
                 return False
 
             logger.info(f"📊 Processing averages from {len(self.data)} samples at {self.next_save_time} UTC")
+            row = self._build_save_row(db, UPSDynamicData, averages, utc_now)
 
-            # Create a new record
-            dynamic_data = UPSDynamicData()
+            self._queue_row(db, UPSDynamicData, row, utc_now)
+            logger.info(f"💾 Queued averaged data at {self.next_save_time} UTC")
 
-            # Set timestamp_utc - already in UTC
-            dynamic_data.timestamp_utc = self.next_save_time
-            logger.info(f"⏰ Setting timestamp_utc to {self.next_save_time} UTC")
+            # Clean the buffer and update next_save_time
+            self.data.clear()
+            self._df = None
+            self._averages.reset()
+            self.next_save_time = self.get_next_minute(utc_now)
+            logger.info(f"Next save scheduled for: {self.next_save_time} UTC")
 
-            # Check critical fields before setting values
-            critical_fields = ['ups_status', 'ups_load', 'ups_realpower', 'ups_realpower_nominal']
-            for field in critical_fields:
-                if field in averages:
-                    logger.info(f"Critical field {field} = {averages[field]} in averages")
-                else:
-                    logger.warning(f"Critical field {field} missing from averages")
-
-            # Set the average values
-            missing_keys = []
-            for key, value in averages.items():
-                if hasattr(dynamic_data, key):
-                    setattr(dynamic_data, key, value)
-                    if key in critical_fields:
-                        logger.info(f"✅ Set critical field {key}={value} on UPSDynamicData")
-                    else:
-                        logger.debug(f"✅ Set {key}={value} on UPSDynamicData")
-                else:
-                    missing_keys.append(key)
-                    logger.warning(f"⚠️ Key {key} not found in UPSDynamicData model")
-            
-            if missing_keys:
-                logger.warning(f"⚠️ {len(missing_keys)} keys from averages were not in the model: {missing_keys[:5]}...")
-                
-            # Double-check critical fields after setting them
-            for field in critical_fields:
-                if hasattr(dynamic_data, field):
-                    value = getattr(dynamic_data, field)
-                    if value is None:
-                        logger.warning(f"⚠️ Critical field '{field}' is None after setting")
-                        if field in averages:
-                            setattr(dynamic_data, field, averages[field])
-                            logger.info(f"Fixed {field} to {averages[field]}")
-                    else:
-                        logger.info(f"Verified {field} = {value} on UPSDynamicData")
-                else:
-                    logger.warning(f"⚠️ Critical field '{field}' not found in UPSDynamicData model")
-
-            # Add to hourly buffer if ups_realpower is present
-            if 'ups_realpower' in averages:
-                self.hourly_data.append({
-                    'timestamp': self.next_save_time,  # Already in UTC
-                    'ups_realpower': averages['ups_realpower']
-                })
-
-                # Check if it's time to calculate the hourly average
-                if utc_now >= self.next_hour:
-                    exact_hour = self.next_hour - timedelta(hours=1)  # Both in UTC
-                    
-                    logger.info(f"Calculating hourly average for hour ending at {self.next_hour} UTC")
-
-                    # Query for records in UTC timeframe
-                    hour_data = UPSDynamicData.query.filter(
-                        UPSDynamicData.timestamp_utc >= exact_hour,
-                        UPSDynamicData.timestamp_utc < self.next_hour
-                    ).all()
-
-                    if hour_data:
-                        powers = [d.ups_realpower for d in hour_data if d.ups_realpower is not None]
-                        if powers:
-                            hourly_avg = sum(powers) / len(powers)
-                            dynamic_data.ups_realpower_hrs = round(hourly_avg, 2)
-                            logger.info(f"📊 Calculated hourly average from {len(powers)} records: {hourly_avg}W. Saving ups_realpower_hrs = {dynamic_data.ups_realpower_hrs}")
-                        else:
-                            logger.warning("📊 No power data available for hourly average calculation.")
-                    else:
-                        logger.warning("📊 No hourly data found in database for hourly average calculation.")
-
-                    # Reset for the next hour
-                    self.hourly_data = []
-                    self.next_hour = self.get_next_hour(utc_now)
-                    logger.info(f"Next hourly calculation at: {self.next_hour} UTC")
-                else:
-                    logger.debug("⏰ Not yet time for hourly calculation.")
+            # Daily aggregation runs in its own task, off the polling path
+            self.start_daily_scheduler(db, UPSDynamicData)
+
+            return True
 
-            # Save in the database
-            with data_lock:
-                db.session.add(dynamic_data)
-                db.session.commit()
-                logger.info(f"💾 Successfully saved averaged data at {self.next_save_time} UTC")
+        except Exception as e:
+            logger.error(f"❌ Error saving averaged data: {str(e)}", exc_info=True)
+            return False
 
-            # Clean the buffer and update next_save_time
-            self.data = []
-            self.df = None
+    def calculate_and_save_multi_ups_averages(self, db, UPSDynamicData, current_time):
+        """
+        Save the aggregated multi-UPS averages once per minute.
+
+        ups_dynamic_data has no per-device column, so the row written is the
+        fleet aggregate; it is queued like the single-UPS rows.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+            current_time: Current timestamp in UTC, taken once per poll
+
+        Returns:
+            bool: True if a row was queued for saving, False otherwise
+        """
+        try:
+            utc_now = current_time
+
+            if self.next_hour is None:
+                self.next_hour = self.get_next_hour(utc_now)
+
+            if not self.is_save_time(utc_now):
+                return False
+
+            aggregated = self.calculate_multi_ups_averages()['aggregated']
+            if not aggregated:
+                return False
+
+            # The aggregate carries dot-notation aliases of every field; only
+            # the underscore names are columns
+            averages = {key: value for key, value in aggregated.items() if '.' not in key}
+
+            logger.info(
+                f"📊 Processing multi-UPS averages from {len(self.aggregated_data)} samples "
+                f"at {self.next_save_time} UTC"
+            )
+            row = self._build_save_row(db, UPSDynamicData, averages, utc_now)
+            self._queue_row(db, UPSDynamicData, row, utc_now)
+            logger.info(f"💾 Queued multi-UPS averaged data at {self.next_save_time} UTC")
+
+            # Start a new save window
+            self.aggregated_data.clear()
+            self._aggregated_df = None
+            for buffer in self.per_ups_data.values():
+                buffer.clear()
+            self._per_ups_df = {}
+            self.reset_multi_ups_averages()
             self.next_save_time = self.get_next_minute(utc_now)
             logger.info(f"Next save scheduled for: {self.next_save_time} UTC")
 
-            if self.should_aggregate_daily(utc_now):
-                self.aggregate_daily_data(db, UPSDynamicData, utc_now)
+            self.start_daily_scheduler(db, UPSDynamicData)
 
             return True
 
         except Exception as e:
-            logger.error(f"❌ Error saving averaged data: {str(e)}", exc_info=True)
+            logger.error(f"❌ Error saving multi-UPS averaged data: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return False
+
+    def _queue_row(self, db, UPSDynamicData, row, current_time):
+        """
+        Queue an averaged row, writing the batch when it is full.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+            row (dict): Column values of the row
+            current_time: Current timestamp in UTC
+        """
+        if not self._exit_flush_registered:
+            # Queued rows are not lost on a clean shutdown
+            app = current_app._get_current_object()
+            atexit.register(self._flush_at_exit, app, db, UPSDynamicData)
+            self._exit_flush_registered = True
+
+        if not self._pending_rows:
+            self._flush_deadline = current_time + timedelta(seconds=WRITE_FLUSH_INTERVAL)
+        self._pending_rows.append(row)
+
+        if len(self._pending_rows) >= WRITE_BATCH_SIZE:
+            self.flush_pending_rows(db, UPSDynamicData, current_time)
+
+    def flush_pending_rows(self, db, UPSDynamicData, current_time):
+        """
+        Write every queued row with one executemany.
+
+        On failure the rows stay queued and the next attempt is deferred by
+        WRITE_FLUSH_INTERVAL.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+            current_time: Current timestamp in UTC
+
+        Returns:
+            bool: True if the queue is empty afterwards, False otherwise
+        """
+        if not self._pending_rows:
+            return True
+
+        rows = list(self._pending_rows)
+        try:
+            bulk_insert_rows(db, UPSDynamicData.__table__, rows)
+        except Exception as e:
+            logger.error(f"❌ Error writing {len(rows)} averaged row(s): {str(e)}")
+            db.session.rollback()
+            self._flush_deadline = current_time + timedelta(seconds=WRITE_FLUSH_INTERVAL)
             return False
 
+        self._pending_rows.clear()
+        self._flush_deadline = None
+        logger.info(f"💾 Saved {len(rows)} averaged row(s) to database")
+        return True
+
+    def _flush_at_exit(self, app, db, UPSDynamicData):
+        """
+        Write the rows still queued when the interpreter exits.
+
+        Args:
+            app: Flask application whose context is used for the write
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+        """
+        if self._pending_rows:
+            with app.app_context():
+                self.flush_pending_rows(db, UPSDynamicData, datetime.now(timezone.utc))
+
+    def flush_pending_rows_if_due(self, db, UPSDynamicData, current_time):
+        """
+        Write the queued rows once the oldest has waited WRITE_FLUSH_INTERVAL.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+            current_time: Current timestamp in UTC
+        """
+        if self._flush_deadline is not None and current_time >= self._flush_deadline:
+            self.flush_pending_rows(db, UPSDynamicData, current_time)
+
     def get_next_minute(self, current_time):
         """
         Calculate the exact next minute in UTC for database storage
         
         Args:
-            current_time (datetime): Current timestamp
+            current_time (datetime): Current timestamp in UTC
         
         Returns:
             datetime: Exact next minute timestamp in UTC
         """
-        # Create a UTC timestamp directly
-        utc_time = datetime.now(pytz.UTC)
-        
         # Calculate the exact next minute in UTC
-        next_minute_utc = utc_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        next_minute_utc = current_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
         
         logger.debug(f"Next save time calculated in UTC: {next_minute_utc}")
         return next_minute_utc
@@ -269,28 +807,17 @@ class UPSDataCache:
             logger.info(f"First data point received. Next save scheduled for: {self.next_save_time}")
 
         # Ensure keys are in the correct format (with underscores instead of dots)
-        formatted_data = {}
-        for key, value in data.items():
-            # Convert key from dot notation to underscore if needed
-            formatted_key = key.replace('.', '_')
-            formatted_data[formatted_key] = value
+        formatted_data = _format_keys(data)
 
-        # Log the transformation if it occurred
-        if len(formatted_data) != len(data):
-            logger.info(f"Transformed {len(data)} keys to {len(formatted_data)} formatted keys")
-        elif any(key != formatted_key for key, formatted_key in zip(data.keys(), formatted_data.keys())):
-            logger.info("Some keys were transformed from dots to underscores")
+        # Log the first transformation only
+        if not self._logged_key_transform and formatted_data.keys() != data.keys():
+            logger.info(f"Transformed {len(data)} keys to {len(formatted_data)} formatted keys (dots to underscores)")
+            self._logged_key_transform = True
 
-        # Add to the buffer
+        # Add to the buffer; the DataFrame is rebuilt on next access
         self.data.append((timestamp, formatted_data))
-        
-        # Convert the buffer to DataFrame
-        df_data = []
-        for ts, d in self.data:
-            row = {'timestamp': ts, **d}
-            df_data.append(row)
-        
-        self.df = pd.DataFrame(df_data)
+        self._df = None
+        self._averages.add(formatted_data)
         logger.debug(f"📥 Added data point (buffer: {len(self.data)})")
         
         # Broadcast cache update to clients via WebSocket
@@ -312,42 +839,25 @@ class UPSDataCache:
         # Process each UPS device
         for ups_id, ups_data in all_ups_data.items():
             # Ensure keys are in the correct format
-            formatted_data = {}
-            data_dict = vars(ups_data) if hasattr(ups_data, '__dict__') else ups_data
-
-            for key, value in data_dict.items():
-                # Convert key from dot notation to underscore if needed
-                formatted_key = key.replace('.', '_')
-                formatted_data[formatted_key] = value
+            formatted_data = _format_keys(_data_dict(ups_data))
 
             # Initialize buffer for this UPS if needed
             if ups_id not in self.per_ups_data:
-                self.per_ups_data[ups_id] = []
+                self.per_ups_data[ups_id] = deque(maxlen=self.size)
+                self._per_ups_averages[ups_id] = _RunningAverages()
 
-            # Add to the UPS-specific buffer
+            # Add to the UPS-specific buffer; its DataFrame is rebuilt on next access
             self.per_ups_data[ups_id].append((timestamp, formatted_data))
-
-            # Convert to DataFrame for this UPS
-            df_data = []
-            for ts, d in self.per_ups_data[ups_id]:
-                row = {'timestamp': ts, **d}
-                df_data.append(row)
-
-            self.per_ups_df[ups_id] = pd.DataFrame(df_data)
+            self._per_ups_df.pop(ups_id, None)
+            self._per_ups_averages[ups_id].add(formatted_data)
 
         # Calculate and store aggregated data
         aggregated = aggregate_ups_data(all_ups_data)
 
-        # Add aggregated data to buffer
+        # Add aggregated data to buffer; its DataFrame is rebuilt on next access
         self.aggregated_data.append((timestamp, aggregated))
-
-        # Convert aggregated buffer to DataFrame
-        agg_df_data = []
-        for ts, d in self.aggregated_data:
-            row = {'timestamp': ts, **d}
-            agg_df_data.append(row)
-
-        self.aggregated_df = pd.DataFrame(agg_df_data)
+        self._aggregated_df = None
+        self._aggregated_averages.add(aggregated)
 
         logger.debug(
             f"📥 Added multi-UPS data: {len(all_ups_data)} UPS devices, "
@@ -362,7 +872,7 @@ class UPSDataCache:
         Check if it's time to save the data
         
         Args:
-            current_time: Current timestamp
+            current_time: Current timestamp in UTC
             
         Returns:
             bool: True if it's time to save, False otherwise
@@ -371,68 +881,61 @@ class UPSDataCache:
         if self.next_save_time is None:
             return False
             
-        # Get current time in UTC for comparison
-        current_utc = datetime.now(pytz.UTC)
-            
         # Check if current time is beyond next_save_time
-        if current_utc >= self.next_save_time:
-            logger.debug(f"⏰ Time to save! Current UTC: {current_utc}, Save time: {self.next_save_time}")
+        if current_time >= self.next_save_time:
+            logger.debug(f"⏰ Time to save! Current UTC: {current_time}, Save time: {self.next_save_time}")
             return True
         else:
             return False
 
     def calculate_averages(self):
         """
-        Calculate averages using Pandas:
-        - Automatically identifies numeric columns
-        - Calculates average for numeric values
-        - Takes last value for non-numeric columns
-        
+        Calculate averages from the running accumulators:
+        - Numeric values (int/float) are averaged
+        - Non-numeric values keep the last value seen
+
         Returns:
             dict: Dictionary with averages and last values
         """
-        if self.df is None or self.df.empty:
-            logger.warning("⚠️ No data available for averaging")
-            return None
-
         try:
-            logger.info("📊 Starting Pandas data processing...")
-            
-            # Log all columns for debugging
-            logger.debug(f"Available columns: {list(self.df.columns)}")
-            
-            # Check if ups_realpower exists in the data
-            if 'ups_realpower' in self.df.columns:
-                logger.info(f"ups_realpower values in buffer: {list(self.df['ups_realpower'].values)}")
-            else:
-                logger.warning("ups_realpower not found in data columns!")
-            
-            # Identify numeric columns
-            numeric_cols = self.df.select_dtypes(include=[np.number]).columns
-            non_numeric_cols = self.df.select_dtypes(exclude=[np.number]).columns
-            non_numeric_cols = non_numeric_cols.drop('timestamp') if 'timestamp' in non_numeric_cols else non_numeric_cols
-
-            logger.debug(f"🔢 Processing {len(numeric_cols)} numeric columns with Pandas")
-            # Calculate averages for numeric columns (rounded to 2 decimal places)
-            averages = self.df[numeric_cols].mean().round(2).to_dict()
+            result = self._averages.averages()
+            if result is None:
+                logger.warning("⚠️ No data available for averaging")
+                return None
 
-            logger.debug(f"📝 Processing {len(non_numeric_cols)} non-numeric columns")
-            # Take last value for non-numeric columns
-            last_values = self.df[non_numeric_cols].iloc[-1].to_dict()
+            if 'ups_realpower' not in self._averages.sums:
+                logger.warning("ups_realpower not found in numeric data!")
 
-            # Combine results
-            result = {**averages, **last_values}
-            
             # Log important calculated values
             logger.info(f"Calculated averages: ups_load={result.get('ups_load', 'N/A')}%, ups_realpower={result.get('ups_realpower', 'N/A')}W")
-            
-            logger.info(f"✅ Pandas processing complete - averaged {len(numeric_cols)} numeric fields")
+
+            logger.info(f"✅ Averaged fields over {len(self.data)} samples")
             return result
 
         except Exception as e:
-            logger.error(f"❌ Error in Pandas processing: {str(e)}")
+            logger.error(f"❌ Error calculating averages: {str(e)}")
             return None
 
+    def calculate_multi_ups_averages(self):
+        """
+        Calculate the averages of the multi-UPS buffers from their running sums.
+
+        Returns:
+            dict: {'aggregated': averages or None, 'per_ups': {ups_id: averages}}
+        """
+        return {
+            'aggregated': self._aggregated_averages.averages(),
+            'per_ups': {
+                ups_id: averages.averages() for ups_id, averages in self._per_ups_averages.items()
+            }
+        }
+
+    def reset_multi_ups_averages(self):
+        """Start a new save window for the multi-UPS running sums."""
+        self._aggregated_averages.reset()
+        for averages in self._per_ups_averages.values():
+            averages.reset()
+
     def is_full(self):
         """
         Check if the buffer is full
@@ -440,20 +943,19 @@ class UPSDataCache:
         Returns:
             bool: True if buffer is full
         """
-        return len(self.data) >= self.size
+        return len(self.data) == self.data.maxlen
 
     def should_aggregate_daily(self, current_time):
         """
         Check if it's time for daily aggregation (4AM UTC)
         
         Args:
-            current_time: Current timestamp (not used as we get fresh UTC time)
+            current_time: Current timestamp in UTC
             
         Returns:
             bool: True if it's time to aggregate daily data, False otherwise
         """
-        # Get current time in UTC
-        now_utc = datetime.now(pytz.UTC)
+        now_utc = current_time
         
         # If it's the first time, initialize last_daily_aggregation
         if self.last_daily_aggregation is None:
@@ -477,6 +979,48 @@ class UPSDataCache:
             
         return False
 
+    def start_daily_scheduler(self, db, UPSDynamicData):
+        """
+        Start the daily aggregation task once.
+
+        Must be called inside an application context; the task pushes that
+        application's context whenever it touches the database.
+
+        Args:
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+        """
+        if self._daily_scheduler_started:
+            return
+
+        try:
+            app = current_app._get_current_object()
+            websocket.start_background_task(self._daily_scheduler, app, db, UPSDynamicData)
+            self._daily_scheduler_started = True
+            logger.info("📅 Daily aggregation scheduler started")
+        except Exception as e:
+            logger.error(f"❌ Could not start daily aggregation scheduler: {str(e)}")
+
+    def _daily_scheduler(self, app, db, UPSDynamicData):
+        """
+        Sleep until the next 4 AM UTC, run the daily aggregation, repeat.
+
+        Args:
+            app: Flask application whose context is used for the database work
+            db: Database instance
+            UPSDynamicData: UPS dynamic data model class
+        """
+        while True:
+            now_utc = datetime.now(timezone.utc)
+            if self.should_aggregate_daily(now_utc):
+                with app.app_context():
+                    self.aggregate_daily_data(db, UPSDynamicData, now_utc)
+                continue
+
+            # should_aggregate_daily keeps last_daily_aggregation at the next run
+            delay = (self.last_daily_aggregation - now_utc).total_seconds()
+            websocket.sleep(max(delay, 1))
+
     def aggregate_daily_data(self, db, UPSDynamicData, current_time):
         """
         Perform daily aggregation
@@ -484,18 +1028,16 @@ class UPSDataCache:
         Args:
             db: Database instance
             UPSDynamicData: UPS dynamic data model class
-            current_time: Current timestamp (not used, we use UTC directly)
+            current_time: Current timestamp in UTC
         """
         try:
-            # Use UTC for database operations
-            now_utc = datetime.now(pytz.UTC)
+            now_utc = current_time
             # Set to midnight of current day in UTC
             aggregation_time = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
             logger.debug(f"📅 Starting daily aggregation at: {aggregation_time} UTC")
 
             # Calculate the average of hourly averages
             logger.debug("📅 Querying hourly averages for daily aggregation...")
-            from sqlalchemy import func
             daily_data = db.session.query(
                 func.avg(UPSDynamicData.ups_realpower_hrs).label('daily_avg')
             ).filter(
@@ -508,13 +1050,13 @@ class UPSDataCache:
                 logger.debug(f"📅 Daily average power calculated: {daily_avg}W")
 
                 # Create entry with previous day as timestamp (UTC)
-                new_daily = UPSDynamicData(
+                stmt = UPSDynamicData.__table__.insert().values(
                     timestamp_utc=aggregation_time - timedelta(days=1),
                     ups_realpower_days=daily_avg
                 )
 
                 with data_lock:
-                    db.session.add(new_daily)
+                    db.session.execute(stmt)
                     db.session.commit()
                     logger.info(f"📅 Daily aggregation saved: {daily_avg}W for {aggregation_time.date()} UTC")
             else:
@@ -544,49 +1086,82 @@ class UPSDataCache:
             # Only send if there's meaningful data
             if not data:
                 return
-            
+
+            # Nobody is listening: keep the sample for the next client instead
+            if not self._has_clients():
+                self._idle_data = data
+                return
+
+            # Check if data changed meaningfully from last broadcast to avoid unnecessary broadcasts
+            if self.last_broadcast:
+                # Always broadcast if status changes, otherwise only on significant numeric changes
+                if (data.get('ups_status') == self.last_broadcast.get('ups_status') and
+                        not _has_significant_change(data, self._last_broadcast_floats)):
+                    logger.debug("🔄 Skipping WebSocket broadcast - no significant changes")
+                    return
+
             # Create a timestamp for the broadcast
             broadcast_data = {
                 'timestamp': datetime.now().isoformat(),
                 **data  # Include all data fields from the cache
             }
-            
-            # Check if data changed meaningfully from last broadcast to avoid unnecessary broadcasts
-            if self.last_broadcast:
-                # Check status change (always broadcast if status changes)
-                status_changed = broadcast_data.get('ups_status') != self.last_broadcast.get('ups_status')
-                
-                # Check for significant numeric changes
-                significant_change = False
-                important_metrics = ['ups_load', 'battery_charge', 'ups_realpower', 'input_voltage']
-                for metric in important_metrics:
-                    if metric in broadcast_data and metric in self.last_broadcast:
-                        try:
-                            current_val = float(broadcast_data[metric] or 0)
-                            last_val = float(self.last_broadcast[metric] or 0)
-                            if abs(current_val - last_val) >= 1.0:  # 1% or 1W threshold
-                                significant_change = True
-                                break
-                        except (ValueError, TypeError):
-                            # If values can't be compared, assume there's a change
-                            significant_change = True
-                            break
-                
-                # Skip broadcast if no meaningful changes
-                if not status_changed and not significant_change:
-                    logger.debug("🔄 Skipping WebSocket broadcast - no significant changes")
-                    return
-            
+
             # Update last broadcast
-            self.last_broadcast = broadcast_data.copy()
+            self.last_broadcast = _Snapshot(broadcast_data)
+            self._last_broadcast_floats = _metric_floats(broadcast_data)
             
             # Broadcast the data
             logger.debug(f"📡 Broadcasting cache update with {len(broadcast_data)} fields")
-            websocket.emit('cache_update', broadcast_data)
+            self._queue_broadcast('cache_update', broadcast_data)
             
         except Exception as e:
             logger.error(f"❌ Error broadcasting cache update: {str(e)}")
     
+    def _queue_broadcast(self, event, payload):
+        """
+        Queue a WebSocket update and schedule a flush if none is pending.
+
+        Updates are full snapshots, so only the latest payload per event is
+        kept; the pending queue is bounded by the number of event types.
+
+        Args:
+            event (str): WebSocket event name
+            payload (dict): Data to emit
+        """
+        with self._broadcast_lock:
+            self._pending_broadcasts[event] = payload
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        websocket.start_background_task(self._flush_broadcasts)
+
+    def _flush_broadcasts(self):
+        """
+        Emit the updates queued during the flush window, one emit per event.
+
+        The window is at least BROADCAST_FLUSH_DELAY and is stretched so that
+        emits stay _emit_interval apart; updates arriving meanwhile replace
+        the pending ones, so busy servers send fewer, fresher snapshots.
+        """
+        next_emit = self._last_emit_time + self._emit_interval
+        websocket.sleep(max(BROADCAST_FLUSH_DELAY, next_emit - time.monotonic()))
+
+        with self._broadcast_lock:
+            pending = self._pending_broadcasts
+            self._pending_broadcasts = {}
+            self._flush_scheduled = False
+
+        client_count = 0
+        for event, payload in pending.items():
+            try:
+                client_count = _emit_to_clients(event, payload)
+            except Exception as e:
+                logger.error(f"❌ Error emitting {event}: {str(e)}")
+
+        self._last_emit_time = time.monotonic()
+        self._emit_interval = _broadcast_interval(client_count)
+
     def get_latest_cache_data(self):
         """
         Get the latest cache data for new WebSocket connections
@@ -594,10 +1169,39 @@ class UPSDataCache:
         Returns:
             dict: Latest cache data or empty dict if no data
         """
+        if self._idle_data is not None:
+            self.last_broadcast = _Snapshot({
+                'timestamp': datetime.now().isoformat(),
+                **self._idle_data
+            })
+            self._last_broadcast_floats = _metric_floats(self.last_broadcast)
+            self._idle_data = None
+
         if not self.last_broadcast:
             return {}
         return self.last_broadcast
 
+    def _has_clients(self):
+        """
+        Check whether any WebSocket client is connected.
+
+        The result is reused for CLIENT_CHECK_TTL seconds so the Socket.IO
+        manager is not walked on every sample; the connect and disconnect
+        handlers invalidate it.
+
+        Returns:
+            bool: True if at least one client is connected
+        """
+        now = time.monotonic()
+        if self._has_clients_value is None or now - self._has_clients_checked >= CLIENT_CHECK_TTL:
+            self._has_clients_value = _clients_connected()
+            self._has_clients_checked = now
+        return self._has_clients_value
+
+    def invalidate_client_check(self):
+        """Force the next broadcast to re-check the connected clients."""
+        self._has_clients_value = None
+
     def broadcast_multi_ups_update(self, aggregated_data, per_ups_data):
         """
         Broadcast multi-UPS cache update to all connected WebSocket clients.
@@ -607,7 +1211,7 @@ class UPSDataCache:
             per_ups_data (dict): Dictionary of {ups_id: UPSData}
         """
         try:
-            if not aggregated_data:
+            if not aggregated_data or not self._has_clients():
                 return
 
             # Create timestamp for broadcast
@@ -622,7 +1226,7 @@ class UPSDataCache:
             # Prepare per-UPS data for broadcast
             broadcast_per_ups = {}
             for ups_id, ups_data in per_ups_data.items():
-                data_dict = vars(ups_data) if hasattr(ups_data, '__dict__') else ups_data
+                data_dict = _data_dict(ups_data)
                 broadcast_per_ups[ups_id] = {
                     'timestamp': timestamp,
                     **data_dict
@@ -638,18 +1242,9 @@ class UPSDataCache:
 
             # Check for significant numeric changes in aggregated data
             if not should_broadcast and self.last_broadcast_aggregated:
-                important_metrics = ['ups_load', 'battery_charge', 'ups_realpower', 'input_voltage']
-                for metric in important_metrics:
-                    if metric in broadcast_aggregated and metric in self.last_broadcast_aggregated:
-                        try:
-                            current_val = float(broadcast_aggregated[metric] or 0)
-                            last_val = float(self.last_broadcast_aggregated[metric] or 0)
-                            if abs(current_val - last_val) >= 1.0:
-                                should_broadcast = True
-                                break
-                        except (ValueError, TypeError):
-                            should_broadcast = True
-                            break
+                should_broadcast = _has_significant_change(
+                    broadcast_aggregated, self._last_broadcast_aggregated_floats
+                )
 
             # Skip broadcast if no meaningful changes
             if not should_broadcast:
@@ -658,6 +1253,7 @@ class UPSDataCache:
 
             # Update last broadcast
             self.last_broadcast_aggregated = broadcast_aggregated.copy()
+            self._last_broadcast_aggregated_floats = _metric_floats(broadcast_aggregated)
             self.last_broadcast_per_ups = broadcast_per_ups.copy()
 
             # Broadcast the multi-UPS data
@@ -671,7 +1267,7 @@ class UPSDataCache:
                 f"📡 Broadcasting multi-UPS update: {len(per_ups_data)} devices, "
                 f"aggregated status={broadcast_aggregated.get('ups_status', 'UNKNOWN')}"
             )
-            websocket.emit('multi_ups_update', multi_ups_broadcast)
+            self._queue_broadcast('multi_ups_update', multi_ups_broadcast)
 
         except Exception as e:
             logger.error(f"❌ Error broadcasting multi-UPS update: {str(e)}")
@@ -713,8 +1309,11 @@ def save_ups_data(db, UPSDynamicData, ups_data_cache):
         ups_config_manager.ensure_initialized()
         enabled_devices = ups_config_manager.get_all_enabled()
 
-        # Use UTC time directly for database operations
-        now_utc = datetime.now(pytz.UTC)
+        # Take the UTC time once per poll and pass it down the call chain
+        now_utc = datetime.now(timezone.utc)
+
+        # Write queued rows whose deadline passed, even if this poll saves nothing
+        ups_data_cache.flush_pending_rows_if_due(db, UPSDynamicData, now_utc)
 
         # Get polling interval from VariableConfig
         try:
@@ -756,10 +1355,13 @@ def save_ups_data(db, UPSDynamicData, ups_data_cache):
             # Add multi-UPS data to cache
             ups_data_cache.add_multi_ups(now_utc, all_ups_data)
 
-            # Check if it's time to save (using aggregated data)
-            # TODO: Implement multi-UPS save logic
             logger.debug(f"📥 Multi-UPS buffer status: aggregated={len(ups_data_cache.aggregated_data)}")
 
+            # Check if it's time to save (using aggregated data)
+            success = ups_data_cache.calculate_and_save_multi_ups_averages(db, UPSDynamicData, now_utc)
+            if success:
+                logger.info("💾 Successfully queued aligned multi-UPS data for the database")
+
             return True, None
 
         # Single-UPS mode: backward compatibility
@@ -767,9 +1369,7 @@ def save_ups_data(db, UPSDynamicData, ups_data_cache):
             logger.debug("📊 Single-UPS mode (backward compatibility)")
 
             # Check connection status first
-            from core.db.internal_checker import is_ups_connected
-
-            if not is_ups_connected():
+            if not internal_checker.is_ups_connected():
                 error_msg = "UPS connection unavailable, skipping data collection"
                 logger.warning(f"⚠️ {error_msg}")
                 return False, error_msg
@@ -777,8 +1377,8 @@ def save_ups_data(db, UPSDynamicData, ups_data_cache):
             # Get data from single UPS
             data = get_ups_data()
 
-            # Convert DotDict to standard dictionary
-            data_dict = vars(data)
+            # Field dict of the DotDict, shared rather than copied
+            data_dict = data.as_dict()
 
             # Log the buffer
             logger.debug(f"📥 Buffer status before add: {len(ups_data_cache.data)}")
@@ -788,7 +1388,7 @@ def save_ups_data(db, UPSDynamicData, ups_data_cache):
             # Check if it's time to save
             success = ups_data_cache.calculate_and_save_averages(db, UPSDynamicData, now_utc)
             if success:
-                logger.info("💾 Successfully saved aligned data to database")
+                logger.info("💾 Successfully queued aligned data for the database")
 
             return True, None
 
@@ -807,6 +1407,7 @@ def handle_websocket_connect():
     """Handle new WebSocket connection and send latest data"""
     from flask import request
     logger.info(f"🟢 WebSocket client connected - SID: {request.sid}")
+    ups_data_cache.invalidate_client_check()
     # Send initial data to the client
     latest_data = ups_data_cache.get_latest_cache_data()
     if latest_data:
@@ -825,6 +1426,7 @@ def handle_websocket_disconnect():
     """Handle WebSocket disconnection"""
     from flask import request
     logger.info(f"🔴 WebSocket client disconnected - SID: {request.sid}")
+    ups_data_cache.invalidate_client_check()
 
 def init_websocket(app):
     """Initialize WebSocket with Flask app"""
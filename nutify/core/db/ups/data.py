@@ -3,7 +3,7 @@ UPS Data Operations Module.
 This module provides functions for retrieving and processing UPS data.
 """
 
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import json
 from datetime import datetime, timedelta
@@ -11,9 +11,90 @@ from sqlalchemy import func, text
 from flask import current_app
 
 from core.logger import database_logger as logger
-from core.db.ups.errors import UPSDataError, UPSConnectionError
-from core.db.ups.utils import UPSData, ups_lock, ups_config, ups_config_manager, calculate_realpower
-from core.settings import UPSC_BIN
+from core.db.ups.errors import UPSDataError, UPSConnectionError, UPSCommandError
+from core.db.ups.utils import UPSData, data_lock, ups_config, ups_config_manager, calculate_realpower
+from core.db.ups.nut_client import get_nut_client
+# Imported as a module: internal_checker is still initializing when it pulls
+# in core.db.ups, so its functions are looked up at call time
+import core.db.internal_checker as internal_checker
+
+def _read_ups_variables(name, host, timeout):
+    """
+    Read every variable of one UPS from its upsd server.
+
+    Args:
+        name (str): UPS name
+        host (str): upsd host ("host" or "host:port")
+        timeout (float): Socket timeout in seconds
+
+    Returns:
+        dict: {nut.variable: value}
+
+    Raises:
+        UPSCommandError: If upsd rejects the request (e.g. UNKNOWN-UPS)
+        UPSConnectionError: If upsd cannot be reached
+        TimeoutError: If upsd does not answer in time
+    """
+    variables = get_nut_client(host).list_vars([name], timeout=timeout)[name]
+    if isinstance(variables, UPSCommandError):
+        raise variables
+    return variables
+
+def _with_realpower(raw_data):
+    """
+    Fill in ups.realpower unless the UPS already reports a non-zero value.
+
+    calculate_realpower only derives the value when it is missing or 0, so
+    the common case of a UPS that reports it skips the call altogether.
+
+    Args:
+        raw_data (dict): {nut.variable: value} as reported by upsd
+
+    Returns:
+        dict: raw_data, with ups.realpower calculated if needed
+    """
+    reported = raw_data.get('ups.realpower')
+    if reported is not None:
+        try:
+            if float(reported) != 0:
+                return raw_data
+        except ValueError:
+            pass
+    return calculate_realpower(raw_data)
+
+# Values already known not to parse as numbers (status words, model names,
+# serials...); float() is not retried on them, so the usual poll raises no
+# ValueError at all. Bounded so changing strings cannot grow it forever.
+_NON_NUMERIC_VALUES_MAX = 1024
+_non_numeric_values = set()
+
+def _transform_variables(raw_data):
+    """
+    Convert NUT variables to database format.
+
+    Keys go from dot notation to underscores and values are converted to
+    float wherever they parse as numbers.
+
+    Args:
+        raw_data (dict): {nut.variable: value} strings
+
+    Returns:
+        dict: {nut_variable: float or str}
+    """
+    non_numeric = _non_numeric_values
+    transformed_data = {}
+    for key, value in raw_data.items():
+        db_key = key.replace('.', '_')
+        if value in non_numeric:
+            transformed_data[db_key] = value
+            continue
+        try:
+            transformed_data[db_key] = float(value)
+        except ValueError:
+            transformed_data[db_key] = value
+            if len(non_numeric) < _NON_NUMERIC_VALUES_MAX:
+                non_numeric.add(value)
+    return transformed_data
 
 def get_available_variables():
     """
@@ -26,29 +107,17 @@ def get_available_variables():
         Exception: If communication with the UPS fails
     """
     try:
-        # Ensure configuration is loaded from database if available
-        if not ups_config.is_initialized():
-            ups_config.load_from_database()
-        
+        # is_initialized() loads the configuration from the database if needed
         if not ups_config.is_initialized():
             logger.error(f"UPS configuration not initialized: {ups_config}")
             raise ValueError("UPS configuration not initialized. Make sure configure_ups() is called before using this function.")
             
-        with ups_lock:
-            result = subprocess.run(
-                [ups_config.command, f'{ups_config.name}@{ups_config.host}'],
-                capture_output=True,
-                text=True,
-                timeout=ups_config.timeout
-            )
-
-            variables = {}
-            for line in result.stdout.splitlines():
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    variables[key.strip()] = value.strip()
-            
-            return variables
+        with ups_config.lock:
+            try:
+                return _read_ups_variables(ups_config.name, ups_config.host, ups_config.timeout)
+            except (UPSCommandError, UPSConnectionError) as e:
+                logger.warning(f"Could not read UPS variables: {str(e)}")
+                return {}
 
     except Exception as e:
         logger.error(f"Error in get_available_variables: {str(e)}")
@@ -66,11 +135,9 @@ def get_ups_data():
     """
     try:
         # Check connection status first using the connection monitor
-        from core.db.internal_checker import is_ups_connected, get_ups_connection_status
-        
-        if not is_ups_connected():
+        if not internal_checker.is_ups_connected():
             # Get connection status for more detailed error
-            status = get_ups_connection_status()
+            status = internal_checker.get_ups_connection_status()
             recovery_status = "Initial recovery" if status.get('recovery_attempts', 0) < 5 else "Extended recovery"
             error_msg = f"UPS connection unavailable ({recovery_status})"
             
@@ -86,14 +153,7 @@ def get_ups_data():
             logger.warning(f"⚠️ {error_msg}")
             return data
         
-        with ups_lock:
-            # Ensure configuration is loaded from database if available
-            if not ups_config.is_initialized():
-                ups_config.load_from_database()
-            
-            # Always use upsc command directly from settings
-            upsc_command = UPSC_BIN
-            
+        with ups_config.lock:
             # Check if we have the required parameters
             if not ups_config.name or not ups_config.host:
                 msg = f"Missing UPS parameters: name={ups_config.name}, host={ups_config.host}"
@@ -110,20 +170,14 @@ def get_ups_data():
             
             # Construct the UPS target identifier
             ups_target = f"{ups_config.name}@{ups_config.host}"
-            logger.debug(f"Running UPS command: {upsc_command} {ups_target}")
+            logger.debug(f"Reading UPS variables from upsd: {ups_target}")
             
             try:
-                # Run the command
-                result = subprocess.run(
-                    [upsc_command, ups_target], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=10
-                )
-                
-                # Check if command failed
-                if result.returncode != 0:
-                    error_msg = f"UPS command failed: {result.stderr.strip()}"
+                # Read the variables over the pooled upsd connection
+                try:
+                    raw_data = _read_ups_variables(ups_config.name, ups_config.host, timeout=10)
+                except (UPSCommandError, UPSConnectionError) as e:
+                    error_msg = f"UPS command failed: {str(e)}"
                     logger.error(error_msg)
                     data = UPSData({
                         'ups_status': 'ERROR',
@@ -135,13 +189,6 @@ def get_ups_data():
                     })
                     return data
                 
-                # Process the command output
-                raw_data = {}
-                for line in result.stdout.splitlines():
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        raw_data[key.strip()] = value.strip()
-                
                 if not raw_data:
                     logger.warning("No data returned from UPS command")
                     data = UPSData({
@@ -155,23 +202,16 @@ def get_ups_data():
                     return data
                 
                 # Calculate real power if needed
-                raw_data = calculate_realpower(raw_data)
+                raw_data = _with_realpower(raw_data)
                 
                 # Transform NUT format keys to database format (from dot notation to underscore)
-                transformed_data = {}
-                for key, value in raw_data.items():
-                    db_key = key.replace('.', '_')
-                    try:
-                        float_value = float(value)
-                        transformed_data[db_key] = float_value
-                    except ValueError:
-                        transformed_data[db_key] = value
+                transformed_data = _transform_variables(raw_data)
                 
                 # Create and return the data object
                 data = UPSData(transformed_data)
                 return data
                 
-            except subprocess.TimeoutExpired:
+            except TimeoutError:
                 error_msg = "UPS command timed out after 10 seconds"
                 logger.error(error_msg)
                 data = UPSData({
@@ -211,12 +251,152 @@ def get_ups_data():
         return data
 
 
+# Upper bound on upsd servers polled at the same time
+MAX_POLL_WORKERS = 32
+
+def _device_status_data(ups_device, status, error_msg):
+    """
+    Build the placeholder data reported for a UPS that could not be read.
+
+    Args:
+        ups_device: UPSSingleConfig of the device
+        status (str): Status to report (ERROR, TIMEOUT, NO_DATA)
+        error_msg (str): Error description
+
+    Returns:
+        UPSData: Data object with zeroed metrics and the error
+    """
+    return UPSData({
+        'ups_id': ups_device.ups_id,
+        'ups_name': ups_device.name,
+        'friendly_name': ups_device.friendly_name,
+        'ups_status': status,
+        'battery_charge': 0.0,
+        'battery_runtime': 0,
+        'input_voltage': 0.0,
+        'output_voltage': 0.0,
+        'error': error_msg
+    })
+
+def _device_data(ups_device, raw_data):
+    """
+    Convert the raw NUT variables of one UPS to its data object.
+
+    Args:
+        ups_device: UPSSingleConfig of the device
+        raw_data (dict): {nut.variable: value} as reported by upsd
+
+    Returns:
+        UPSData: Data object with database-format keys and UPS metadata
+    """
+    # Calculate real power if needed
+    raw_data = _with_realpower(raw_data)
+
+    # Transform NUT format keys to database format
+    transformed_data = _transform_variables(raw_data)
+
+    # Add UPS metadata
+    transformed_data['ups_id'] = ups_device.ups_id
+    transformed_data['ups_name'] = ups_device.name
+    transformed_data['friendly_name'] = ups_device.friendly_name
+    transformed_data['is_primary'] = ups_device.is_primary
+
+    logger.debug(
+        f"✅ Retrieved data from UPS {ups_device.name}: "
+        f"status={transformed_data.get('ups_status', 'UNKNOWN')}, "
+        f"battery={transformed_data.get('battery_charge', 0)}%"
+    )
+    return UPSData(transformed_data)
+
+def _read_host(host, devices):
+    """
+    Read every device of one upsd server in a single round trip.
+
+    Only the network read happens here, so it can run in a worker thread
+    without an app context; the replies are converted by _host_data.
+
+    Args:
+        host (str): upsd host as configured for the devices
+        devices (list): UPSSingleConfig objects on that host
+
+    Returns:
+        dict: {ups name: variables or UPSCommandError}, or the exception
+        raised by the read
+    """
+    names = [ups_device.name for ups_device in devices]
+    timeout = max(ups_device.timeout or 10 for ups_device in devices)
+    logger.debug(f"🔌 Polling UPS {', '.join(names)} on {host}")
+
+    try:
+        return get_nut_client(host).list_vars(names, timeout=timeout)
+    except Exception as e:
+        return e
+
+def _host_data(devices, replies):
+    """
+    Convert the replies of one upsd server to data objects.
+
+    Runs in the polling thread, which has the app context that the real
+    power calculation needs to read the configured nominal power.
+
+    Args:
+        devices (list): UPSSingleConfig objects on that host
+        replies: Result of _read_host for that host
+
+    Returns:
+        dict: {ups_id: UPSData}, with placeholder data for failed devices
+    """
+    host_data = {}
+
+    if isinstance(replies, TimeoutError):
+        for ups_device in devices:
+            error_msg = f"UPS command timed out for {ups_device.name}"
+            logger.warning(error_msg)
+            host_data[ups_device.ups_id] = _device_status_data(ups_device, 'TIMEOUT', error_msg)
+        return host_data
+
+    if isinstance(replies, Exception):
+        for ups_device in devices:
+            error_msg = f"Error polling UPS {ups_device.name}: {str(replies)}"
+            logger.error(error_msg)
+            host_data[ups_device.ups_id] = _device_status_data(ups_device, 'ERROR', error_msg)
+        return host_data
+
+    for ups_device in devices:
+        try:
+            raw_data = replies[ups_device.name]
+
+            # Check if upsd rejected the request
+            if isinstance(raw_data, UPSCommandError):
+                error_msg = f"UPS command failed for {ups_device.name}: {raw_data}"
+                logger.warning(error_msg)
+                host_data[ups_device.ups_id] = _device_status_data(ups_device, 'ERROR', error_msg)
+                continue
+
+            if not raw_data:
+                logger.warning(f"No data returned for UPS {ups_device.name}")
+                host_data[ups_device.ups_id] = _device_status_data(
+                    ups_device, 'NO_DATA', 'No data returned from UPS'
+                )
+                continue
+
+            host_data[ups_device.ups_id] = _device_data(ups_device, raw_data)
+
+        except Exception as e:
+            error_msg = f"Error polling UPS {ups_device.name}: {str(e)}"
+            logger.error(error_msg)
+            host_data[ups_device.ups_id] = _device_status_data(ups_device, 'ERROR', error_msg)
+
+    return host_data
+
 def get_all_ups_data():
     """
     Get current data from all enabled UPS devices.
 
     This function polls all UPS devices configured in the database
-    and returns their current status and metrics.
+    and returns their current status and metrics. Devices are read over a
+    pooled upsd connection per server, with all the devices of a server
+    requested in one round trip and the servers polled concurrently.
 
     Returns:
         dict: Dictionary of {ups_id: UPSData} containing data from all enabled UPS
@@ -233,133 +413,22 @@ def get_all_ups_data():
 
         logger.debug(f"📊 Polling {len(enabled_devices)} UPS device(s)")
 
+        # Group the devices by upsd server
+        devices_by_host = {}
         for ups_device in enabled_devices:
-            try:
-                # Check connection status for this specific UPS
-                from core.db.internal_checker import is_ups_connected
-
-                with ups_lock:
-                    # Construct the UPS target identifier
-                    ups_target = f"{ups_device.name}@{ups_device.host}"
-                    upsc_command = UPSC_BIN
-
-                    logger.debug(f"🔌 Polling UPS {ups_device.ups_id}: {ups_target}")
-
-                    try:
-                        # Run the command
-                        result = subprocess.run(
-                            [upsc_command, ups_target],
-                            capture_output=True,
-                            text=True,
-                            timeout=ups_device.timeout
-                        )
-
-                        # Check if command failed
-                        if result.returncode != 0:
-                            error_msg = f"UPS command failed for {ups_device.name}: {result.stderr.strip()}"
-                            logger.warning(error_msg)
-                            data = UPSData({
-                                'ups_id': ups_device.ups_id,
-                                'ups_name': ups_device.name,
-                                'friendly_name': ups_device.friendly_name,
-                                'ups_status': 'ERROR',
-                                'battery_charge': 0.0,
-                                'battery_runtime': 0,
-                                'input_voltage': 0.0,
-                                'output_voltage': 0.0,
-                                'error': error_msg
-                            })
-                            all_data[ups_device.ups_id] = data
-                            continue
-
-                        # Process the command output
-                        raw_data = {}
-                        for line in result.stdout.splitlines():
-                            if ':' in line:
-                                key, value = line.split(':', 1)
-                                raw_data[key.strip()] = value.strip()
-
-                        if not raw_data:
-                            logger.warning(f"No data returned for UPS {ups_device.name}")
-                            data = UPSData({
-                                'ups_id': ups_device.ups_id,
-                                'ups_name': ups_device.name,
-                                'friendly_name': ups_device.friendly_name,
-                                'ups_status': 'NO_DATA',
-                                'battery_charge': 0.0,
-                                'battery_runtime': 0,
-                                'input_voltage': 0.0,
-                                'output_voltage': 0.0,
-                                'error': 'No data returned from UPS'
-                            })
-                            all_data[ups_device.ups_id] = data
-                            continue
-
-                        # Calculate real power if needed
-                        raw_data = calculate_realpower(raw_data)
-
-                        # Transform NUT format keys to database format
-                        transformed_data = {}
-                        for key, value in raw_data.items():
-                            db_key = key.replace('.', '_')
-                            try:
-                                float_value = float(value)
-                                transformed_data[db_key] = float_value
-                            except ValueError:
-                                transformed_data[db_key] = value
-
-                        # Add UPS metadata
-                        transformed_data['ups_id'] = ups_device.ups_id
-                        transformed_data['ups_name'] = ups_device.name
-                        transformed_data['friendly_name'] = ups_device.friendly_name
-                        transformed_data['is_primary'] = ups_device.is_primary
-
-                        # Create and store the data object
-                        data = UPSData(transformed_data)
-                        all_data[ups_device.ups_id] = data
-
-                        logger.debug(
-                            f"✅ Retrieved data from UPS {ups_device.name}: "
-                            f"status={transformed_data.get('ups_status', 'UNKNOWN')}, "
-                            f"battery={transformed_data.get('battery_charge', 0)}%"
-                        )
-
-                    except subprocess.TimeoutExpired:
-                        error_msg = f"UPS command timed out for {ups_device.name}"
-                        logger.warning(error_msg)
-                        data = UPSData({
-                            'ups_id': ups_device.ups_id,
-                            'ups_name': ups_device.name,
-                            'friendly_name': ups_device.friendly_name,
-                            'ups_status': 'TIMEOUT',
-                            'battery_charge': 0.0,
-                            'battery_runtime': 0,
-                            'input_voltage': 0.0,
-                            'output_voltage': 0.0,
-                            'error': error_msg
-                        })
-                        all_data[ups_device.ups_id] = data
-
-                    except Exception as e:
-                        error_msg = f"Error polling UPS {ups_device.name}: {str(e)}"
-                        logger.error(error_msg)
-                        data = UPSData({
-                            'ups_id': ups_device.ups_id,
-                            'ups_name': ups_device.name,
-                            'friendly_name': ups_device.friendly_name,
-                            'ups_status': 'ERROR',
-                            'battery_charge': 0.0,
-                            'battery_runtime': 0,
-                            'input_voltage': 0.0,
-                            'output_voltage': 0.0,
-                            'error': error_msg
-                        })
-                        all_data[ups_device.ups_id] = data
-
-            except Exception as e:
-                error_msg = f"Error processing UPS {ups_device.ups_id}: {str(e)}"
-                logger.error(error_msg)
-                continue
+            devices_by_host.setdefault(ups_device.host, []).append(ups_device)
+
+        # Servers are read concurrently; each read is almost all network wait.
+        # The replies are converted here, in the caller's app context
+        if len(devices_by_host) == 1:
+            for host, devices in devices_by_host.items():
+                all_data.update(_host_data(devices, _read_host(host, devices)))
+        else:
+            workers = min(MAX_POLL_WORKERS, len(devices_by_host))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                all_replies = executor.map(_read_host, devices_by_host.keys(), devices_by_host.values())
+                for devices, replies in zip(devices_by_host.values(), all_replies):
+                    all_data.update(_host_data(devices, replies))
 
         logger.debug(f"📊 Successfully polled {len(all_data)}/{len(enabled_devices)} UPS devices")
         return all_data
@@ -372,6 +441,9 @@ def get_all_ups_data():
 def get_historical_data(db, UPSData, start_time, end_time):
     """
     Get the historical data of the UPS in a time range
+
+    db.session is the app context's scoped session and is removed at
+    teardown, so it is left open here rather than torn down on every call.
     
     Args:
         db: Database instance
@@ -387,37 +459,34 @@ def get_historical_data(db, UPSData, start_time, end_time):
             UPSData.timestamp_utc.between(start_time, end_time)
         ).order_by(UPSData.timestamp_utc.asc())
         
+        # Column names are resolved once, not per row
+        columns = tuple(
+            column.name for column in UPSData.__table__.columns
+            if column.name not in ('id', 'timestamp')
+        )
+
         result = []
         for entry in data.all():
-            record = {'timestamp': entry.timestamp_utc.isoformat()}
-            
+            # Loaded column values, read without the attribute descriptors
+            values = entry.__dict__
+            record = {'timestamp': values['timestamp_utc'].isoformat()}
+
             # Convert all fields to float where possible
-            for column in UPSData.__table__.columns:
-                if column.name not in ['id', 'timestamp']:
-                    try:
-                        value = getattr(entry, column.name)
-                        if value is not None:
-                            if isinstance(value, (int, float)):
-                                record[column.name] = float(value)
-                            elif isinstance(value, str):
-                                try:
-                                    record[column.name] = float(value)
-                                except ValueError:
-                                    record[column.name] = value
-                            else:
-                                record[column.name] = value
-                    except (ValueError, TypeError, AttributeError) as e:
-                        logger.debug(f"Skipping field {column.name}: {e}")
-                        continue
-            
+            for name in columns:
+                value = values.get(name)
+                if value is None:
+                    continue
+                try:
+                    record[name] = float(value)
+                except (TypeError, ValueError):
+                    record[name] = value
+
             result.append(record)
         
         return result
     except Exception as e:
         logger.error(f"Error retrieving historical data: {e}")
         return []
-    finally:
-        db.session.close()
 
 def calculate_daily_power(db, UPSDynamicData):
     """
@@ -436,28 +505,28 @@ def calculate_daily_power(db, UPSDynamicData):
         start_date = previous_day.replace(hour=0, minute=0, second=0, microsecond=0)
         end_date = start_date + timedelta(days=1)
         
-        # Get all hourly data of the previous day
-        hourly_data = UPSDynamicData.query.filter(
+        # Let the database average the hourly values of the previous day
+        daily_power = db.session.query(
+            func.avg(UPSDynamicData.ups_realpower_hrs)
+        ).filter(
             UPSDynamicData.timestamp_utc >= start_date,
             UPSDynamicData.timestamp_utc < end_date,
             UPSDynamicData.ups_realpower_hrs.isnot(None)
-        ).all()
-        
-        if not hourly_data:
+        ).scalar()
+
+        if daily_power is None:
             logger.warning("No hourly data available for daily aggregation")
             return
         
-        # Calculate the daily average power
-        daily_power = sum([d.ups_realpower_hrs for d in hourly_data]) / len(hourly_data)
-        
-        # Create or update the daily record
-        daily_record = UPSDynamicData(
-            timestamp_utc=start_date,
-            ups_realpower_days=round(daily_power, 2)
-        )
-        
-        with db.session.begin():
-            db.session.add(daily_record)
+        # Write the daily record(s) with one Core executemany (no ORM objects)
+        rows = [{
+            'timestamp_utc': start_date,
+            'ups_realpower_days': round(daily_power, 2)
+        }]
+
+        with data_lock:
+            db.session.execute(UPSDynamicData.__table__.insert(), rows)
+            db.session.commit()
             logger.info(f"💾 Saved daily power average: {daily_power:.2f}W for {start_date.date()}")
             
     except Exception as e:
@@ -732,8 +732,8 @@ def insert_initial_dynamic_data(db):
                 try:
                     from core.db.ups.data import get_ups_data
                     data = get_ups_data()
-                    # Convert from DotDict to standard dict
-                    data_dict = vars(data)
+                    # Field dict of the DotDict
+                    data_dict = data.as_dict()
                 except Exception as e:
                     logger.warning(f"Cannot get UPS data for initialization: {str(e)}")
                     logger.warning("Using default values for dynamic data initialization")
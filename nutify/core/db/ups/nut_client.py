@@ -0,0 +1,196 @@
+"""
+NUT Network Client Module.
+This module provides a minimal client for the upsd network protocol, used to
+read UPS variables without starting an upsc process for every poll.
+"""
+
+import re
+import socket
+import threading
+
+from core.settings import NUT_PORT
+from core.logger import database_logger as logger
+from core.db.ups.errors import UPSConnectionError, UPSCommandError
+
+def parse_host(host):
+    """
+    Split an upsc-style host ("host", "host:port" or "[v6addr]:port").
+
+    Args:
+        host (str): Host as stored in the UPS configuration
+
+    Returns:
+        tuple: (hostname, port)
+    """
+    if host.startswith('['):
+        address, _, rest = host[1:].partition(']')
+        port = rest[1:] if rest.startswith(':') else ''
+        return address, int(port) if port else NUT_PORT
+
+    # A bare IPv6 address contains several colons and no port
+    if host.count(':') == 1:
+        address, _, port = host.partition(':')
+        return address, int(port) if port else NUT_PORT
+
+    return host, NUT_PORT
+
+# One "VAR <ups> <variable> "<value>"" line of a LIST VAR reply
+_VAR_LINE = re.compile(r'^VAR \S+ (\S+) "(.*)"\r?$', re.MULTILINE)
+
+# Bytes requested from the socket per read
+_RECV_SIZE = 65536
+
+def _parse_var_list(body):
+    """
+    Parse the VAR lines of a LIST VAR reply in one pass.
+
+    Args:
+        body (str): Reply text between the BEGIN and END lines
+
+    Returns:
+        dict: {variable: value} with the protocol escapes removed
+    """
+    variables = dict(_VAR_LINE.findall(body))
+    for key, value in variables.items():
+        if '\\' in value:
+            variables[key] = value.replace('\\"', '"').replace('\\\\', '\\')
+    return variables
+
+class NutClient:
+    """
+    Persistent connection to one upsd server.
+
+    Requests on a connection are answered in order, so several LIST VAR
+    requests are written at once and their replies read back in sequence.
+    The connection is opened lazily and dropped on any I/O error; the next
+    request reconnects.
+    """
+
+    def __init__(self, host, port=NUT_PORT):
+        self.host = host
+        self.port = port
+        self._sock = None
+        self._buffer = b''
+        self._lock = threading.Lock()
+
+    def _connect(self, timeout):
+        self._sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        self._buffer = b''
+        logger.debug(f"🔌 Connected to upsd at {self.host}:{self.port}")
+
+    def close(self):
+        """Close the connection, if open."""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buffer = b''
+
+    def _read_until(self, marker):
+        """
+        Read from the socket until marker is buffered.
+
+        Returns:
+            int: Index just past the marker in the buffer
+        """
+        start = 0
+        while True:
+            index = self._buffer.find(marker, start)
+            if index >= 0:
+                return index + len(marker)
+            # The marker may straddle the next read
+            start = max(0, len(self._buffer) - len(marker) + 1)
+            chunk = self._sock.recv(_RECV_SIZE)
+            if not chunk:
+                raise UPSConnectionError(f"upsd at {self.host}:{self.port} closed the connection")
+            self._buffer += chunk
+
+    def _take(self, end):
+        """Remove and decode the first end bytes of the buffer."""
+        data = self._buffer[:end]
+        self._buffer = self._buffer[end:]
+        return data.decode('utf-8', errors='replace')
+
+    def _read_var_list(self, name):
+        """
+        Read the reply to one LIST VAR request.
+
+        The whole reply is buffered up to its END line and parsed in one
+        pass, rather than line by line.
+
+        Returns:
+            dict or UPSCommandError: {variable: value}, or the error upsd reported
+        """
+        first_line = self._take(self._read_until(b'\n')).rstrip('\r\n')
+        if first_line.startswith('ERR '):
+            return UPSCommandError(f"{first_line[4:]} ({name}@{self.host})")
+        if first_line != f'BEGIN LIST VAR {name}':
+            raise UPSConnectionError(f"Unexpected reply from upsd: {first_line!r}")
+
+        end_line = f'END LIST VAR {name}\n'.encode('utf-8')
+        body = self._take(self._read_until(end_line))
+        return _parse_var_list(body)
+
+    def list_vars(self, names, timeout=10):
+        """
+        Read every variable of the given UPS names in one round trip.
+
+        Args:
+            names (list): UPS names known to this upsd
+            timeout (float): Socket timeout in seconds
+
+        Returns:
+            dict: {name: {variable: value}} or {name: UPSCommandError} for
+                  names upsd rejected (e.g. UNKNOWN-UPS)
+
+        Raises:
+            UPSConnectionError: If the server cannot be reached or misbehaves
+            TimeoutError: If the server does not answer within timeout
+        """
+        request = ''.join(f'LIST VAR {name}\n' for name in names).encode('utf-8')
+
+        with self._lock:
+            # A pooled connection may have been closed by the server since
+            # the last poll, so a failed request is retried once on a new one
+            for attempt in (1, 2):
+                reused = self._sock is not None
+                try:
+                    if not reused:
+                        self._connect(timeout)
+                    self._sock.settimeout(timeout)
+                    self._sock.sendall(request)
+                    return {name: self._read_var_list(name) for name in names}
+                except TimeoutError:
+                    self.close()
+                    raise
+                except (OSError, UPSConnectionError) as e:
+                    self.close()
+                    if attempt == 2 or not reused:
+                        if isinstance(e, UPSConnectionError):
+                            raise
+                        raise UPSConnectionError(f"upsd at {self.host}:{self.port}: {e}") from e
+
+# One pooled client per upsd server
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_nut_client(host):
+    """
+    Get the pooled client for an upsc-style host string.
+
+    Args:
+        host (str): "host", "host:port" or "[v6addr]:port"
+
+    Returns:
+        NutClient: Client shared by every UPS on that server
+    """
+    address = parse_host(host)
+    client = _clients.get(address)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(address)
+            if client is None:
+                client = _clients[address] = NutClient(*address)
+    return client
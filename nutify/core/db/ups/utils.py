@@ -6,11 +6,14 @@ This module provides utility functions for UPS operations.
 import logging
 import subprocess
 import threading
+import time
 import pytz
+import numpy as np
 from datetime import datetime
 from flask import current_app
+from sqlalchemy import Boolean, text
 
-from core.settings import UPSC_BIN
+from core.settings import UPSC_BIN, get_ups_realpower_nominal
 from core.logger import database_logger as logger
 # Import nut_parser for configuration file access
 from core.db.nut_parser import get_ups_connection_params, get_nut_configuration
@@ -19,6 +22,9 @@ from core.db.nut_parser import get_ups_connection_params, get_nut_configuration
 class UPSSingleConfig:
     """Configuration for a single UPS device"""
 
+    __slots__ = ('ups_id', 'host', 'name', 'command', 'timeout', 'is_primary',
+                 'is_enabled', 'friendly_name', 'initialized', 'config_source', 'lock')
+
     def __init__(self, ups_id=None, host=None, name=None, command=None, timeout=10,
                  is_primary=False, is_enabled=True, friendly_name=None):
         self.ups_id = ups_id
@@ -31,6 +37,7 @@ class UPSSingleConfig:
         self.friendly_name = friendly_name or name
         self.initialized = bool(host and name and command)
         self.config_source = "database"
+        self.lock = threading.Lock()  # Serializes reads of this device
 
     def configure(self, host, name, command, timeout):
         """Configure the UPS connection parameters"""
@@ -50,21 +57,44 @@ class UPSSingleConfig:
         return f"UPSSingleConfig(id={self.ups_id}, name={self.name}, host={self.host}, primary={self.is_primary}, enabled={self.is_enabled})"
 
 
+# Seconds before a failed configuration load is attempted again
+CONFIG_RETRY_INTERVAL = 30
+
+# Built once at import time so every load reuses the same statement and its
+# compiled form from SQLAlchemy's statement cache. The flag columns are typed
+# so rows already carry Python bools, and an empty friendly name falls back
+# to the UPS name in SQL
+_SQL_ENABLED_DEVICES = text("""
+    SELECT id, name, COALESCE(NULLIF(friendly_name, ''), name) AS friendly_name,
+           host, is_primary, is_enabled
+    FROM ups_devices
+    WHERE is_enabled = 1
+    ORDER BY order_index, id
+""").columns(is_primary=Boolean, is_enabled=Boolean)
+
 # UPS Configuration Manager for multi-UPS support
 class UPSConfigManager:
     """
     Manager for multiple UPS device configurations.
     Replaces the old singleton pattern to support multi-UPS monitoring.
+    Use the module-level ups_config_manager instead of creating another one.
     """
-    _instance = None
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(UPSConfigManager, cls).__new__(cls)
-            cls._instance.devices = {}  # {ups_id: UPSSingleConfig}
-            cls._instance.initialized = False
-            cls._instance.config_files_checked = False
-        return cls._instance
+    def __init__(self):
+        self.devices = {}  # {ups_id: UPSSingleConfig}
+        self.initialized = False
+        self.config_files_checked = False
+        self.last_config_files_failure = None  # monotonic time of the last failed parse
+        self.last_load_failure = None  # monotonic time of the last failed load
+        self._enabled_cache = None  # get_all_enabled() result
+        self._primary_cache = None  # get_primary() result
+        self._by_name_cache = None  # {name: UPSSingleConfig}
+
+    def invalidate_lookups(self):
+        """Drop the cached device lookups after self.devices changed"""
+        self._enabled_cache = None
+        self._primary_cache = None
+        self._by_name_cache = None
 
     def load_from_database(self):
         """
@@ -75,16 +105,11 @@ class UPSConfigManager:
         """
         try:
             from core.db.ups import db
-            from sqlalchemy import text
 
-            result = db.session.execute(text("""
-                SELECT id, name, friendly_name, host, is_primary, is_enabled
-                FROM ups_devices
-                WHERE is_enabled = 1
-                ORDER BY order_index, id
-            """))
+            result = db.session.execute(_SQL_ENABLED_DEVICES)
 
             self.devices = {}
+            self.invalidate_lookups()
             for row in result:
                 ups_id, name, friendly_name, host, is_primary, is_enabled = row
 
@@ -94,9 +119,9 @@ class UPSConfigManager:
                     name=name,
                     command=UPSC_BIN,
                     timeout=10,
-                    is_primary=bool(is_primary),
-                    is_enabled=bool(is_enabled),
-                    friendly_name=friendly_name or name
+                    is_primary=is_primary,
+                    is_enabled=is_enabled,
+                    friendly_name=friendly_name
                 )
 
                 self.devices[ups_id] = config
@@ -145,6 +170,7 @@ class UPSConfigManager:
                 config.config_source = "nut_files"
 
                 self.devices = {0: config}
+                self.invalidate_lookups()
                 self.initialized = True
 
                 logger.info(f"✅ UPS configuration loaded from NUT config files: {config}")
@@ -167,15 +193,31 @@ class UPSConfigManager:
         if self.initialized:
             return True
 
+        # Don't query the database on every poll while nothing is configured;
+        # reload() clears the failure as soon as the configuration changes
+        now = time.monotonic()
+        if self.last_load_failure is not None and now - self.last_load_failure < CONFIG_RETRY_INTERVAL:
+            return False
+
         # Try database first
         if self.load_from_database():
+            self.last_load_failure = None
             return True
 
-        # Fall back to config files for backward compatibility
-        if not self.config_files_checked:
+        # Fall back to config files for backward compatibility. reload()
+        # allows a new parse, but files that just failed to give a UPS are
+        # not parsed again within the retry interval
+        files_failure = self.last_config_files_failure
+        if not self.config_files_checked and (
+            files_failure is None or now - files_failure >= CONFIG_RETRY_INTERVAL
+        ):
             if self.load_from_config_files():
+                self.last_load_failure = None
+                self.last_config_files_failure = None
                 return True
+            self.last_config_files_failure = now
 
+        self.last_load_failure = now
         return False
 
     def get_all_enabled(self):
@@ -183,10 +225,17 @@ class UPSConfigManager:
         Get all enabled UPS devices.
 
         Returns:
-            list: List of UPSSingleConfig objects
+            list: List of UPSSingleConfig objects (shared, do not modify)
         """
-        self.ensure_initialized()
-        return [config for config in self.devices.values() if config.is_enabled]
+        if self._enabled_cache is not None:
+            return self._enabled_cache
+
+        if not self.initialized:
+            self.ensure_initialized()
+        enabled = [config for config in self.devices.values() if config.is_enabled]
+        if self.initialized:
+            self._enabled_cache = enabled
+        return enabled
 
     def get_primary(self):
         """
@@ -195,16 +244,26 @@ class UPSConfigManager:
         Returns:
             UPSSingleConfig: Primary UPS or first enabled device, or None
         """
-        self.ensure_initialized()
+        # Hit on every property read of the ups_config wrapper
+        if self._primary_cache is not None:
+            return self._primary_cache
+
+        if not self.initialized:
+            self.ensure_initialized()
+
+        # First try to find explicitly marked primary, then fall back to
+        # the first enabled device
+        primary = next(
+            (config for config in self.devices.values() if config.is_primary and config.is_enabled),
+            None
+        )
+        if primary is None:
+            enabled = self.get_all_enabled()
+            primary = enabled[0] if enabled else None
 
-        # First try to find explicitly marked primary
-        for config in self.devices.values():
-            if config.is_primary and config.is_enabled:
-                return config
-
-        # Fall back to first enabled device
-        enabled = self.get_all_enabled()
-        return enabled[0] if enabled else None
+        if self.initialized:
+            self._primary_cache = primary
+        return primary
 
     def get_by_id(self, ups_id):
         """
@@ -216,7 +275,8 @@ class UPSConfigManager:
         Returns:
             UPSSingleConfig: UPS configuration or None
         """
-        self.ensure_initialized()
+        if not self.initialized:
+            self.ensure_initialized()
         return self.devices.get(ups_id)
 
     def get_by_name(self, name):
@@ -229,23 +289,29 @@ class UPSConfigManager:
         Returns:
             UPSSingleConfig: UPS configuration or None
         """
-        self.ensure_initialized()
-        for config in self.devices.values():
-            if config.name == name:
-                return config
-        return None
+        by_name = self._by_name_cache
+        if by_name is None:
+            if not self.initialized:
+                self.ensure_initialized()
+            # Names are unique in ups_devices
+            by_name = {config.name: config for config in self.devices.values()}
+            if self.initialized:
+                self._by_name_cache = by_name
+        return by_name.get(name)
 
     def reload(self):
         """Reload UPS configurations from database"""
         self.initialized = False
         self.config_files_checked = False
+        self.last_load_failure = None
+        self.invalidate_lookups()
         return self.ensure_initialized()
 
     def __str__(self):
         return f"UPSConfigManager({len(self.devices)} device(s), initialized={self.initialized})"
 
 
-# Global instance (singleton)
+# Global instance; the module is the singleton
 ups_config_manager = UPSConfigManager()
 
 
@@ -255,13 +321,8 @@ class UPSConfig:
     """
     Backward compatibility wrapper for the old UPSConfig singleton.
     Delegates to the primary UPS in UPSConfigManager.
+    Use the module-level ups_config instead of creating another one.
     """
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(UPSConfig, cls).__new__(cls)
-        return cls._instance
 
     @property
     def host(self):
@@ -287,6 +348,12 @@ class UPSConfig:
     def initialized(self):
         return ups_config_manager.initialized
 
+    @property
+    def lock(self):
+        """Lock of the primary UPS, or the module-level ups_lock if there is none"""
+        primary = ups_config_manager.get_primary()
+        return primary.lock if primary else ups_lock
+
     @property
     def config_source(self):
         primary = ups_config_manager.get_primary()
@@ -309,6 +376,7 @@ class UPSConfig:
                 is_enabled=True
             )
             ups_config_manager.devices[0] = config
+            ups_config_manager.invalidate_lookups()
             ups_config_manager.initialized = True
             return True
 
@@ -318,7 +386,7 @@ class UPSConfig:
 
     def is_initialized(self):
         """Check if UPS configuration is initialized"""
-        return ups_config_manager.ensure_initialized()
+        return ups_config_manager.initialized or ups_config_manager.ensure_initialized()
 
     def __str__(self):
         primary = ups_config_manager.get_primary()
@@ -329,33 +397,42 @@ class UPSConfig:
 # Global instance for backward compatibility
 ups_config = UPSConfig()
 
-# Locks for synchronization
+# Locks for synchronization: ups_lock is the fallback of ups_config.lock when
+# no UPS is configured (each UPSSingleConfig has its own lock); data_lock stays
+# global since every writer shares the one SQLite database
 ups_lock = threading.Lock()
 data_lock = threading.Lock()
 
-class DotDict:
+class DotDict(dict):
     """
     Utility class to access dictionaries as objects
     Example: instead of dict['key'] allows dict.key
     
     This implementation supports both attribute access (obj.key)
-    and dictionary-style item assignment (obj['key'] = value)
+    and dictionary-style item assignment (obj['key'] = value).
+    Fields are stored once, as the dict items; a missing attribute raises
+    AttributeError so hasattr()/getattr() with a default keep working.
     """
-    def __init__(self, dictionary):
-        self._data = {}
-        for key, value in dictionary.items():
-            setattr(self, key, value)
-            self._data[key] = value
-    
-    def __getitem__(self, key):
-        return self._data[key]
-    
-    def __setitem__(self, key, value):
-        setattr(self, key, value)
-        self._data[key] = value
-        
-    def __contains__(self, key):
-        return key in self._data
+    __slots__ = ()
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __delattr__(self, key):
+        try:
+            del self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def as_dict(self):
+        """Return the field dict (the object itself, not a copy)"""
+        return self
 
 # Alias DotDict as UPSData for better semantics
 UPSData = DotDict
@@ -374,11 +451,14 @@ def configure_ups(host, name, command, timeout, source="api_call"):
     # Debug logs to verify parameter values
     logger.debug(f"🔌 Setting UPS configuration: host={host}, name={name}, command={command}, timeout={timeout}, source={source}")
     
-    # Set the source in the singleton class
-    ups_config.config_source = source
-    
     # Configure the singleton instance
     success = ups_config.configure(host, name, command, timeout)
+
+    # Record the source on the primary config, which the config_source
+    # property of the wrapper reads (the property itself is read-only)
+    primary = ups_config_manager.get_primary()
+    if primary:
+        primary.config_source = source
     
     # Skip database update - this is now disabled as requested
     logger.info(f"⏩ Skipping UPS configuration save to database, using configuration files instead: host={host}, name={name}")
@@ -388,12 +468,18 @@ def configure_ups(host, name, command, timeout, source="api_call"):
     logger.info(f"UPS configuration updated: host={host}, name={name}, source={source}")
     return success
 
-def utc_to_local(utc_dt):
+# Bound once; CACHE_TIMEZONE itself is not cached since the settings page can
+# change it at runtime
+_UTC = pytz.UTC
+
+def utc_to_local(utc_dt, tz=None):
     """
     Convert UTC datetime to local timezone.
     
     Args:
         utc_dt: UTC datetime object
+        tz: Local timezone; defaults to current_app.CACHE_TIMEZONE. Callers
+            converting many values can read it once and pass it in
         
     Returns:
         datetime: Local timezone datetime object
@@ -401,21 +487,23 @@ def utc_to_local(utc_dt):
     if utc_dt is None:
         return None
         
-    # Ensure datetime has UTC timezone
+    # Naive datetimes are UTC; an aware one converts directly from its own
+    # timezone, so no intermediate conversion to UTC is needed
     if utc_dt.tzinfo is None:
-        utc_dt = pytz.UTC.localize(utc_dt)
-    elif utc_dt.tzinfo != pytz.UTC:
-        utc_dt = utc_dt.astimezone(pytz.UTC)
+        utc_dt = _UTC.localize(utc_dt)
         
     # Convert to local timezone using CACHE_TIMEZONE
-    return utc_dt.astimezone(current_app.CACHE_TIMEZONE)
+    if tz is None:
+        tz = current_app.CACHE_TIMEZONE
+    return utc_dt.astimezone(tz)
 
-def local_to_utc(local_dt):
+def local_to_utc(local_dt, tz=None):
     """
     Convert local timezone datetime to UTC.
     
     Args:
         local_dt: Local timezone datetime object
+        tz: Timezone of naive values; defaults to current_app.CACHE_TIMEZONE
         
     Returns:
         datetime: UTC datetime object
@@ -424,11 +512,16 @@ def local_to_utc(local_dt):
         return None
         
     # If datetime has no timezone, assume it's in local timezone from CACHE_TIMEZONE
-    if local_dt.tzinfo is None:
-        local_dt = current_app.CACHE_TIMEZONE.localize(local_dt)
+    tzinfo = local_dt.tzinfo
+    if tzinfo is None:
+        if tz is None:
+            tz = current_app.CACHE_TIMEZONE
+        local_dt = tz.localize(local_dt)
+    elif tzinfo is _UTC:
+        return local_dt
         
     # Convert to UTC
-    return local_dt.astimezone(pytz.UTC)
+    return local_dt.astimezone(_UTC)
 
 def get_supported_value(data, field, default='N/A'):
     """
@@ -442,13 +535,41 @@ def get_supported_value(data, field, default='N/A'):
     Returns:
         The value of the field or the default value
     """
-    try:
+    # UPSData is a dict; other objects (e.g. model rows) go through getattr
+    if isinstance(data, dict):
+        value = data.get(field)
+    else:
         value = getattr(data, field, None)
-        if value is not None and value != '':
-            return value
-        return default
-    except AttributeError:
-        return default
+    if value is not None and value != '':
+        return value
+    return default
+
+# Seconds the nominal power read from the database is reused by
+# calculate_realpower before it is read again
+NOMINAL_POWER_TTL = 60
+
+# (value, monotonic time of the read)
+_nominal_power_cache = (None, None)
+
+def _get_nominal_power_setting():
+    """
+    Get the UPS nominal power setting, read from the database at most once
+    per NOMINAL_POWER_TTL seconds.
+
+    A missing value is not cached: outside an application context the
+    getter returns None even when a value is configured.
+
+    Returns:
+        The nominal power from get_ups_realpower_nominal(), or None
+    """
+    global _nominal_power_cache
+    value, read_at = _nominal_power_cache
+    now = time.monotonic()
+    if read_at is None or now - read_at >= NOMINAL_POWER_TTL:
+        value = get_ups_realpower_nominal()
+        if value is not None:
+            _nominal_power_cache = (value, now)
+    return value
 
 def calculate_realpower(data):
     """
@@ -476,21 +597,17 @@ def calculate_realpower(data):
         dot_key = 'ups.realpower'
         underscore_key = 'ups_realpower'
         
-        # Get current value (if exists)
-        current_value = None
-        if dot_key in data:
-            current_value = data[dot_key]
-        elif underscore_key in data:
-            current_value = data[underscore_key]
+        # Get current value (if exists), one lookup per key format
+        current_value = data.get(dot_key)
+        if current_value is None:
+            current_value = data.get(underscore_key)
         
         # Calculate only if value doesn't exist or is 0
         if current_value is None or float(current_value) == 0:
             # Get load value, checking both formats
-            load_value = None
-            if 'ups.load' in data:
-                load_value = data['ups.load']
-            elif 'ups_load' in data:
-                load_value = data['ups_load']
+            load_value = data.get('ups.load')
+            if load_value is None:
+                load_value = data.get('ups_load')
             
             load_percent = float(load_value if load_value is not None else 0)
             
@@ -498,22 +615,19 @@ def calculate_realpower(data):
             # 1. Directly from UPS data
             # 2. From database
             # 3. Default value as last resort
-            nominal_value = None
-            
+
             # First check UPS data - highest priority
-            if 'ups.realpower.nominal' in data:
-                nominal_value = data['ups.realpower.nominal']
-                logger.debug(f"⚡ Using nominal power from UPS data (ups.realpower.nominal): {nominal_value}W")
-            elif 'ups_realpower_nominal' in data:
-                nominal_value = data['ups_realpower_nominal']
-                logger.debug(f"⚡ Using nominal power from UPS data (ups_realpower_nominal): {nominal_value}W")
+            for nominal_key in ('ups.realpower.nominal', 'ups_realpower_nominal'):
+                nominal_value = data.get(nominal_key)
+                if nominal_value is not None:
+                    logger.debug(f"⚡ Using nominal power from UPS data ({nominal_key}): {nominal_value}W")
+                    break
             
             # If not found in UPS data, try database
             if nominal_value is None:
                 try:
                     # Try to get from settings using the getter function
-                    from core.settings import get_ups_realpower_nominal
-                    db_value = get_ups_realpower_nominal()
+                    db_value = _get_nominal_power_setting()
                     if db_value is not None:
                         nominal_value = db_value
                         logger.debug(f"⚡ Using nominal power from database: {nominal_value}W")
@@ -526,13 +640,13 @@ def calculate_realpower(data):
                 logger.warning(f"⚠️ No nominal power found in UPS data or database. Using default: {nominal_value}W")
             
             # Calculate real power if we have valid values
-            if load_percent > 0 and float(nominal_value) > 0:
-                nominal_power = float(nominal_value)
+            nominal_power = float(nominal_value) if load_percent > 0 else 0.0
+            if nominal_power > 0:
                 realpower = (nominal_power * load_percent) / 100
                 
-                # Update both key versions for compatibility
-                data[dot_key] = str(round(realpower, 2))
-                data[underscore_key] = str(round(realpower, 2))
+                # Update both key versions for compatibility, formatted once
+                # (the value is parsed back to float with the other variables)
+                data[dot_key] = data[underscore_key] = f"{realpower:.2f}"
                 
                 logger.debug(f"Calculated realpower: {realpower:.2f}W (nominal={nominal_power}W, load={load_percent}%)")
             else:
@@ -540,4 +654,22 @@ def calculate_realpower(data):
     except Exception as e:
         logger.error(f"Error calculating realpower: {str(e)}", exc_info=True)
     
-    return data 
\ No newline at end of file
+    return data
+
+def calculate_realpower_bulk(loads, nominals):
+    """
+    Calculate real power for many samples at once with the formula used by
+    calculate_realpower: Power = realpower_nominal * (ups.load/100)
+
+    Args:
+        loads: Sequence or array of load percentages
+        nominals: Sequence or array of nominal powers (W), same length
+
+    Returns:
+        numpy.ndarray: Real power in W; 0.0 where the load or the nominal
+        power is not positive (or missing, as NaN)
+    """
+    loads = np.asarray(loads, dtype=np.float64)
+    nominals = np.asarray(nominals, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        return np.where((loads > 0) & (nominals > 0), nominals * loads / 100.0, 0.0) 
@@ -2,9 +2,10 @@ from flask import render_template, jsonify, request, current_app
 from datetime import datetime, timedelta
 from ..db.ups import (
     db, get_ups_data, get_historical_data, get_supported_value, get_ups_model,
-    VariableConfig, data_lock, ups_data_cache
+    VariableConfig, data_lock, ups_data_cache, calculate_realpower_bulk
 )
 import calendar
+import numpy as np
 from sqlalchemy import func
 import pytz
 from .. import settings
@@ -414,23 +415,23 @@ def calculate_energy_stats(data, period_type):
                     total_energy = power * 0.25  # Wh (power × 0.25 hours)
                     logger.debug(f"Calculated energy from single point: {total_energy}Wh")
                 elif len(valid_data_points) > 1:
-                    # Process multiple points with time difference
-                    for i in range(1, len(valid_data_points)):
-                        # Calculate duration between points in hours
-                        time_diff = (valid_data_points[i].timestamp_utc - valid_data_points[i-1].timestamp_utc).total_seconds() / 3600
-                        
-                        # Skip if time difference is too large (more than 2 hours)
-                        if time_diff > 2:
-                            continue
-                            
-                        # Calculate power for this interval (average of current and previous)
-                        current_power = (float(valid_data_points[i].ups_realpower_nominal) * float(valid_data_points[i].ups_load)) / 100
-                        prev_power = (float(valid_data_points[i-1].ups_realpower_nominal) * float(valid_data_points[i-1].ups_load)) / 100
-                        avg_power = (current_power + prev_power) / 2
-                        
-                        # Energy in Wh = Power (W) * Time (h)
-                        interval_energy = avg_power * time_diff
-                        total_energy += interval_energy
+                    # Power of every point in one pass
+                    powers = calculate_realpower_bulk(
+                        [row.ups_load for row in valid_data_points],
+                        [row.ups_realpower_nominal for row in valid_data_points]
+                    )
+                    
+                    # Duration between consecutive points in hours
+                    time_diffs = np.array([
+                        (current.timestamp_utc - previous.timestamp_utc).total_seconds()
+                        for previous, current in zip(valid_data_points, valid_data_points[1:])
+                    ]) / 3600
+                    
+                    # Power of each interval is the average of its two points;
+                    # energy in Wh = Power (W) * Time (h), skipping intervals
+                    # longer than 2 hours
+                    avg_powers = (powers[1:] + powers[:-1]) / 2
+                    total_energy = float(np.sum(avg_powers * time_diffs, where=time_diffs <= 2))
                     
                     logger.debug(f"Calculated energy using load and nominal power: {total_energy}Wh")
                     
@@ -28,10 +28,7 @@ def register_api_routes(app):
             from core.settings import get_ups_realpower_nominal
             
             # Convert the data object to a dictionary
-            data_dict = {}
-            for key in dir(data):
-                if not key.startswith('_') and not callable(getattr(data, key)):
-                    data_dict[key] = getattr(data, key)
+            data_dict = {key: value for key, value in data.items() if not key.startswith('_')}
             
             # Add the UPS_REALPOWER_NOMINAL value
             data_dict['UPS_REALPOWER_NOMINAL'] = get_ups_realpower_nominal()
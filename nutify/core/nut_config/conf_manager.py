@@ -1,8 +1,112 @@
 import os
 import re
+import threading
+from functools import lru_cache
 from flask import current_app
 from jinja2 import Environment, FileSystemLoader, Template
 
+# One Jinja2 environment per template directory, shared by every
+# NUTConfManager so templates are read and compiled once. The templates ship
+# with the application, so they are not checked for changes
+_environments = {}
+_environments_lock = threading.Lock()
+
+def _get_environment(template_dir):
+    """
+    Get the shared Jinja2 environment for a template directory.
+
+    Args:
+        template_dir: Directory containing the template files
+
+    Returns:
+        Environment: Environment whose template cache outlives the manager
+    """
+    env = _environments.get(template_dir)
+    if env is None:
+        with _environments_lock:
+            env = _environments.get(template_dir)
+            if env is None:
+                env = _environments[template_dir] = Environment(
+                    loader=FileSystemLoader(template_dir),
+                    auto_reload=False,
+                    cache_size=50
+                )
+    return env
+
+@lru_cache(maxsize=64)
+def _resolve_template(templates_dir, filename, mode):
+    """
+    Find the template file for a configuration file and mode.
+
+    Results are cached, so repeated regenerations do not stat the template
+    files again; NUTConfManager.clear_cache() forgets them.
+
+    Returns:
+        str: Path to the template file, or None if there is none
+    """
+    # Try mode-specific template first, then fall back to the empty
+    # template for netclient mode; one stat() per candidate
+    candidates = [f"{filename}.{mode}"]
+    if mode == 'netclient':
+        candidates.append(f"{filename}.empty")
+
+    for candidate in candidates:
+        template_path = os.path.join(templates_dir, candidate)
+        try:
+            os.stat(template_path)
+        except OSError:
+            continue
+        return template_path
+
+    return None
+
+# {path: ((st_mtime_ns, st_size), content)} of the plain templates read so far
+_template_contents = {}
+
+def _read_template(template_path):
+    """
+    Read a template file, reusing the content read before while the file's
+    modification time and size are unchanged.
+
+    Returns:
+        str: Template content
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    st = os.stat(template_path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _template_contents.get(template_path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(template_path, 'r') as f:
+        content = f.read()
+    _template_contents[template_path] = (key, content)
+    return content
+
+# A {{NAME}} placeholder of the plain templates
+_PLACEHOLDER_RE = re.compile(r'\{\{([^}]+)\}\}')
+
+# Sensible defaults for common placeholders that no variable supplies
+_COMMON_DEFAULTS = {
+    'ADMIN_USERNAME': 'admin',
+    'ADMIN_PASSWORD': 'adminpass',
+    'MONITOR_USERNAME': 'monuser',
+    'MONITOR_PASSWORD': 'monpass',
+    'UPS_NAME': 'ups',
+    'DRIVER': 'usbhid-ups',
+    'PORT': 'auto',
+    'DESCRIPTION': 'UPS',
+    'ADDITIONAL_USERS': ''
+}
+
+# Escape applied by clean_variable_name: double quotes are escaped
+_CONF_ESCAPE = str.maketrans({'"': '\\"'})
+
+# The first MODE= line of nut.conf
+_MODE_RE = re.compile(rb'^[ \t]*MODE=(.*)$', re.MULTILINE)
+
 class NUTConfManager:
     """
     Manager for NUT configuration files that uses template files
@@ -30,25 +134,23 @@ class NUTConfManager:
         Returns:
             Path to the template file
         """
-        # Try mode-specific template first
-        template_path = os.path.join(self.templates_dir, f"{filename}.{mode}")
-        
-        # If it doesn't exist, fall back to the empty template for netclient mode
-        if not os.path.exists(template_path) and mode == 'netclient':
-            template_path = os.path.join(self.templates_dir, f"{filename}.empty")
-            
-            # If empty template doesn't exist, log an error
-            if not os.path.exists(template_path):
-                current_app.logger.error(f"No template found for {filename} in {mode} mode")
-                return None
-        
-        # If file exists, return the path
-        if os.path.exists(template_path):
-            return template_path
+        template_path = _resolve_template(self.templates_dir, filename, mode)
         
         # If no template found, log error
-        current_app.logger.error(f"No template found for {filename} in {mode} mode")
-        return None
+        if template_path is None:
+            current_app.logger.error(f"No template found for {filename} in {mode} mode")
+        return template_path
+    
+    @classmethod
+    def clear_cache(cls):
+        """
+        Forget the resolved template paths and the compiled templates, so
+        template files added or changed on disk are picked up.
+        """
+        _resolve_template.cache_clear()
+        _template_contents.clear()
+        with _environments_lock:
+            _environments.clear()
     
     def render_template(self, template_path, variables):
         """
@@ -61,51 +163,37 @@ class NUTConfManager:
         Returns:
             Rendered template content
         """
-        if not template_path or not os.path.exists(template_path):
+        if not template_path:
             return ""
         
         try:
-            with open(template_path, 'r') as f:
-                content = f.read()
+            content = _read_template(template_path)
+            
+            current_app.logger.debug("Rendering template %s", template_path)
             
-            # Log variables for debugging
-            current_app.logger.debug(f"Rendering template {template_path}")
-            current_app.logger.debug(f"Variables: {variables}")
+            unmatched = []
             
-            # Replace variables in the template
-            for key, value in variables.items():
-                placeholder = f"{{{{%s}}}}" % key
-                if placeholder in content:
-                    current_app.logger.debug(f"Replacing {placeholder} with {value}")
-                    content = content.replace(placeholder, str(value))
-                else:
-                    current_app.logger.debug(f"Placeholder {placeholder} not found in template")
+            def replace(match):
+                # Variables first, then the common defaults; anything else
+                # is left in place
+                key = match.group(1)
+                if key in variables:
+                    return str(variables[key])
+                unmatched.append(key)
+                return _COMMON_DEFAULTS.get(key, match.group(0))
             
-            # Check for any remaining unmatched placeholders
-            remaining_placeholders = re.findall(r'{{([^}]+)}}', content)
-            if remaining_placeholders:
-                current_app.logger.warning(f"Unmatched placeholders in template {template_path}: {remaining_placeholders}")
-                
-                # Auto-replace common placeholders with sensible defaults
-                common_defaults = {
-                    'ADMIN_USERNAME': 'admin',
-                    'ADMIN_PASSWORD': 'adminpass',
-                    'MONITOR_USERNAME': 'monuser',
-                    'MONITOR_PASSWORD': 'monpass',
-                    'UPS_NAME': 'ups',
-                    'DRIVER': 'usbhid-ups',
-                    'PORT': 'auto',
-                    'DESCRIPTION': 'UPS',
-                    'ADDITIONAL_USERS': ''
-                }
-                
-                for placeholder in remaining_placeholders:
-                    if placeholder in common_defaults:
-                        default_value = common_defaults[placeholder]
-                        current_app.logger.warning(f"Auto-replacing {placeholder} with default: {default_value}")
-                        content = content.replace(f"{{{{{placeholder}}}}}", default_value)
+            # Replace every placeholder in one pass over the template
+            content = _PLACEHOLDER_RE.sub(replace, content)
+            
+            if unmatched:
+                current_app.logger.warning("Unmatched placeholders in template %s: %s", template_path, unmatched)
+                for key in dict.fromkeys(unmatched):
+                    if key in _COMMON_DEFAULTS:
+                        current_app.logger.warning("Auto-replacing %s with default: %s", key, _COMMON_DEFAULTS[key])
             
             return content
+        except FileNotFoundError:
+            return ""
         except Exception as e:
             current_app.logger.error(f"Error rendering template {template_path}: {e}")
             return ""
@@ -164,9 +252,7 @@ class NUTConfManager:
             return ""
 
         # Basic cleaning to prevent injection
-        value = str(value)
-        value = value.replace('"', '\\"')  # Escape double quotes
-        return value
+        return str(value).translate(_CONF_ESCAPE)
 
     def render_jinja2_template(self, template_path, variables):
         """
@@ -177,28 +263,27 @@ class NUTConfManager:
             variables: Dictionary of variables to pass to template
 
         Returns:
-            Rendered template content
+            Rendered template content, or None if Jinja2 could not render it
         """
         if not template_path or not os.path.exists(template_path):
             return ""
 
         try:
-            # Create Jinja2 environment
+            # Compiled templates are cached by the shared environment
             template_dir = os.path.dirname(template_path)
             template_name = os.path.basename(template_path)
 
-            env = Environment(loader=FileSystemLoader(template_dir))
-            template = env.get_template(template_name)
+            template = _get_environment(template_dir).get_template(template_name)
 
             # Render the template
             content = template.render(**variables)
 
-            current_app.logger.debug(f"Rendered Jinja2 template {template_path}")
+            current_app.logger.debug("Rendered Jinja2 template %s", template_path)
             return content
 
         except Exception as e:
             current_app.logger.error(f"Error rendering Jinja2 template {template_path}: {e}")
-            return ""
+            return None
 
     def get_multi_ups_conf_files(self, mode, ups_devices, global_vars=None):
         """
@@ -247,11 +332,13 @@ class NUTConfManager:
             template_path = self.get_template_path(filename, mode)
             if template_path:
                 # Use Jinja2 for rendering (supports loops and conditionals)
-                conf_files[filename] = self.render_jinja2_template(template_path, template_vars)
+                content = self.render_jinja2_template(template_path, template_vars)
 
-                # Fallback to simple rendering if Jinja2 fails or for non-Jinja2 templates
-                if not conf_files[filename]:
-                    conf_files[filename] = self.render_template(template_path, template_vars)
+                # Fallback to simple rendering only if Jinja2 fails; an empty
+                # result is a valid rendering and is not rendered again
+                if content is None:
+                    content = self.render_template(template_path, template_vars)
+                conf_files[filename] = content
 
         return conf_files
 
@@ -259,42 +346,35 @@ class NUTConfManager:
         """
         Load enabled UPS devices from the database.
 
+        Rows are streamed from the cursor in batches and each is copied once
+        into its dictionary. The result is a tuple rather than a generator
+        because the templates test and iterate UPS_DEVICES more than once.
+
         Returns:
-            List of UPS device dictionaries
+            Tuple of UPS device dictionaries
         """
         try:
             from core.db.ups import db
             from sqlalchemy import text
 
+            # Empty or missing names, hosts and descriptions fall back in SQL
             result = db.session.execute(text("""
-                SELECT id, name, friendly_name, driver, port, host,
-                       description, vendor_id, product_id, serial
+                SELECT id, name,
+                       COALESCE(NULLIF(friendly_name, ''), name) AS friendly_name,
+                       driver, port,
+                       COALESCE(NULLIF(host, ''), 'localhost') AS host,
+                       COALESCE(NULLIF(description, ''), name) AS description,
+                       vendor_id, product_id, serial
                 FROM ups_devices
                 WHERE is_enabled = 1
                 ORDER BY order_index
             """))
 
-            devices = []
-            for row in result:
-                device = {
-                    'id': row[0],
-                    'name': row[1],
-                    'friendly_name': row[2] or row[1],
-                    'driver': row[3],
-                    'port': row[4],
-                    'host': row[5] or 'localhost',
-                    'description': row[6] or row[1],
-                    'vendor_id': row[7],
-                    'product_id': row[8],
-                    'serial': row[9],
-                }
-                devices.append(device)
-
-            return devices
+            return tuple(dict(row) for row in result.yield_per(50).mappings())
 
         except Exception as e:
             current_app.logger.error(f"Error loading UPS devices from database: {e}")
-            return []
+            return ()
 
     def regenerate_configs_from_db(self, mode=None):
         """
@@ -337,12 +417,10 @@ class NUTConfManager:
         try:
             nut_conf_path = '/etc/nut/nut.conf'
             if os.path.exists(nut_conf_path):
-                with open(nut_conf_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line.startswith('MODE=') and not line.startswith('#'):
-                            mode = line.split('=', 1)[1].strip().strip('"\'')
-                            return mode
+                with open(nut_conf_path, 'rb') as f:
+                    match = _MODE_RE.search(f.read())
+                if match:
+                    return match.group(1).strip().strip(b'"\'').decode('utf-8')
             return 'standalone'
         except Exception as e:
             current_app.logger.error(f"Error reading NUT mode: {e}")
@@ -808,10 +808,8 @@ def get_ups_json():
         # Get the UPS data
         ups_data = get_ups_data()
         
-        # Convert DotDict to regular dict (it has a _data attribute that contains the actual dict)
-        regular_dict = {}
-        if ups_data and hasattr(ups_data, '_data'):
-            regular_dict = dict(ups_data._data)
+        # Convert DotDict to regular dict
+        regular_dict = dict(ups_data) if ups_data else {}
         
         # Format the timestamp with proper timezone
         tz = current_app.CACHE_TIMEZONE
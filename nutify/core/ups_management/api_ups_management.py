@@ -4,15 +4,64 @@ UPS Management API Routes.
 This module provides REST API endpoints for managing UPS devices.
 """
 
-from flask import jsonify, request
+from flask import current_app, jsonify, request
+from sqlalchemy import func, select
 from core.ups_management import ups_management_bp
 from core.logger import database_logger as logger
 from core.db.ups import db
 from core.db.orm import UPSDevice
 from core.nut_config.conf_manager import NUTConfManager
 from core.db.ups.utils import ups_config_manager
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
 import subprocess
+import threading
+
+# Fields of each device returned by /api/devices, in query column order
+_DEVICE_LIST_KEYS = (
+    'id', 'name', 'friendly_name', 'driver', 'port', 'host', 'description',
+    'is_enabled', 'is_primary', 'connection_type', 'vendor_id', 'product_id',
+    'serial', 'order_index'
+)
+
+# Bumped by every endpoint that changes a device, so the /api/devices ETag
+# changes even when the timestamp and count of the table do not
+_devices_generation = 0
+_devices_generation_lock = threading.Lock()
+
+# NUT configuration templates and the manager that renders them, shared by
+# every regeneration
+_TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'nut_config',
+    'conf_templates'
+)
+_conf_manager = NUTConfManager(_TEMPLATES_DIR)
+
+# Configuration files read by the UPS drivers; other changes only need upsd
+# to reload
+DRIVER_CONFIG_FILES = ('nut.conf', 'ups.conf')
+
+# Seconds a scheduled regeneration waits for further device changes, so a
+# burst of API calls regenerates the files (and restarts NUT) once
+REGENERATE_DELAY = 0.5
+
+# Pending regeneration timer and its lock, and the lock that keeps two
+# regenerations from writing the files at the same time
+_regenerate_timer = None
+_regenerate_timer_lock = threading.Lock()
+_regenerate_lock = threading.Lock()
+
+# Connection tests run at the same time by /api/test-all
+MAX_TEST_WORKERS = 16
+
+
+def _bump_devices_generation():
+    """Record that a device was added, changed or deleted."""
+    global _devices_generation
+    with _devices_generation_lock:
+        _devices_generation += 1
 
 
 @ups_management_bp.route('/api/devices', methods=['GET'])
@@ -20,36 +69,43 @@ def get_devices():
     """
     Get all UPS devices.
 
+    The response carries an ETag derived from the device change counter of
+    this process, the latest device update and the device count; a request whose If-None-Match matches it gets a 304
+    without the device list being loaded.
+
     Returns:
         JSON: List of all UPS devices with their details
     """
     try:
-        devices = UPSDevice.query.order_by(UPSDevice.order_index, UPSDevice.id).all()
-
-        devices_list = []
-        for device in devices:
-            devices_list.append({
-                'id': device.id,
-                'name': device.name,
-                'friendly_name': device.friendly_name,
-                'driver': device.driver,
-                'port': device.port,
-                'host': device.host,
-                'description': device.description,
-                'is_enabled': device.is_enabled,
-                'is_primary': device.is_primary,
-                'connection_type': device.connection_type,
-                'vendor_id': device.vendor_id,
-                'product_id': device.product_id,
-                'serial': device.serial,
-                'order_index': device.order_index
-            })
-
-        return jsonify({
+        # Any add, update or delete changes the generation, the latest
+        # update or the count
+        generation = _devices_generation
+        latest_update, device_count = db.session.query(
+            func.max(UPSDevice.updated_at), func.count(UPSDevice.id)
+        ).one()
+        etag = hashlib.blake2b(
+            f"{generation}:{latest_update}:{device_count}".encode(), digest_size=8
+        ).hexdigest()
+
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        # Only the listed columns are selected, without building ORM objects
+        rows = db.session.query(
+            *(getattr(UPSDevice, key) for key in _DEVICE_LIST_KEYS)
+        ).order_by(UPSDevice.order_index, UPSDevice.id).all()
+
+        devices_list = [dict(zip(_DEVICE_LIST_KEYS, row)) for row in rows]
+
+        response = jsonify({
             'status': 'success',
             'devices': devices_list,
             'count': len(devices_list)
         })
+        response.set_etag(etag)
+        return response
 
     except Exception as e:
         logger.error(f"❌ Error retrieving UPS devices: {str(e)}")
@@ -106,10 +162,11 @@ def add_device():
         logger.info(f"✅ Added new UPS device: {new_device.name} (ID: {new_device.id})")
 
         # Regenerate NUT configuration files
-        regenerate_nut_configs()
+        schedule_nut_config_regeneration()
 
         # Reload UPS config manager
         ups_config_manager.reload()
+        _bump_devices_generation()
 
         return jsonify({
             'status': 'success',
@@ -152,10 +209,11 @@ def update_device(ups_id):
         logger.info(f"✅ Updated UPS device ID {ups_id}")
 
         # Regenerate NUT configuration files
-        regenerate_nut_configs()
+        schedule_nut_config_regeneration()
 
         # Reload UPS config manager
         ups_config_manager.reload()
+        _bump_devices_generation()
 
         return jsonify({
             'status': 'success',
@@ -183,25 +241,29 @@ def toggle_device(ups_id):
         JSON: Status and new enabled state
     """
     try:
-        device = UPSDevice.query.get(ups_id)
+        # The device and the number of enabled devices in one query
+        enabled_devices = select(func.count()).select_from(UPSDevice).where(
+            UPSDevice.is_enabled.is_(True)
+        ).scalar_subquery()
+        row = db.session.query(UPSDevice, enabled_devices).filter(UPSDevice.id == ups_id).first()
 
-        if not device:
+        if not row:
             return jsonify({
                 'status': 'error',
                 'message': f'UPS device with ID {ups_id} not found'
             }), 404
 
+        device, enabled_count = row
+
         # Toggle the enabled state
         new_state = not device.is_enabled
 
         # Prevent disabling the last enabled device
-        if not new_state:
-            enabled_count = UPSDevice.query.filter_by(is_enabled=True).count()
-            if enabled_count <= 1:
-                return jsonify({
-                    'status': 'error',
-                    'message': 'Cannot disable the last enabled UPS device'
-                }), 400
+        if not new_state and enabled_count <= 1:
+            return jsonify({
+                'status': 'error',
+                'message': 'Cannot disable the last enabled UPS device'
+            }), 400
 
         # Update the device
         device.is_enabled = new_state
@@ -210,10 +272,11 @@ def toggle_device(ups_id):
         logger.info(f"✅ {'Enabled' if new_state else 'Disabled'} UPS device: {device.name}")
 
         # Regenerate NUT configuration files (will exclude disabled devices)
-        regenerate_nut_configs()
+        schedule_nut_config_regeneration()
 
         # Reload UPS config manager
         ups_config_manager.reload()
+        _bump_devices_generation()
 
         return jsonify({
             'status': 'success',
@@ -262,10 +325,11 @@ def delete_device(ups_id):
         logger.info(f"✅ Deleted UPS device ID {ups_id}")
 
         # Regenerate NUT configuration files
-        regenerate_nut_configs()
+        schedule_nut_config_regeneration()
 
         # Reload UPS config manager
         ups_config_manager.reload()
+        _bump_devices_generation()
 
         return jsonify({
             'status': 'success',
@@ -281,6 +345,82 @@ def delete_device(ups_id):
         }), 500
 
 
+def _run_upsc(name, host):
+    """
+    Query a UPS with upsc.
+
+    Args:
+        name: UPS name
+        host: Host of the upsd server
+
+    Returns:
+        tuple: (connected, ups.status value or '', stderr of upsc)
+
+    Raises:
+        subprocess.TimeoutExpired: If upsc does not answer within 10 seconds
+    """
+    from core.settings import UPSC_BIN
+
+    result = subprocess.run(
+        [UPSC_BIN, f"{name}@{host}"],
+        capture_output=True,
+        text=True,
+        timeout=10
+    )
+
+    if result.returncode != 0:
+        return False, '', result.stderr.strip()
+
+    # Parse UPS status from output
+    status_line = ""
+    for line in result.stdout.splitlines():
+        if 'ups.status:' in line:
+            status_line = line.split(':', 1)[1].strip()
+            break
+    return True, status_line, ''
+
+
+def _test_device(ups_id, name, host, friendly_name):
+    """
+    Test the connection to one UPS device for /api/test-all.
+
+    Returns:
+        dict: Connection test result of the device
+    """
+    try:
+        connected, ups_status, error = _run_upsc(name, host)
+    except subprocess.TimeoutExpired:
+        return {
+            'id': ups_id,
+            'status': 'error',
+            'message': 'Connection test timed out',
+            'connected': False
+        }
+    except Exception as e:
+        logger.error(f"❌ Error testing connection to UPS {ups_id}: {str(e)}")
+        return {
+            'id': ups_id,
+            'status': 'error',
+            'message': f'Error testing connection: {str(e)}',
+            'connected': False
+        }
+
+    if connected:
+        return {
+            'id': ups_id,
+            'status': 'success',
+            'message': f'Successfully connected to {friendly_name}',
+            'ups_status': ups_status or 'ONLINE',
+            'connected': True
+        }
+    return {
+        'id': ups_id,
+        'status': 'warning',
+        'message': f'Could not connect to {friendly_name}: {error}',
+        'connected': False
+    }
+
+
 @ups_management_bp.route('/api/test-connection/<int:ups_id>', methods=['POST'])
 def test_connection(ups_id):
     """
@@ -302,34 +442,19 @@ def test_connection(ups_id):
             }), 404
 
         # Test connection using upsc command
-        from core.settings import UPSC_BIN
-
-        ups_target = f"{device.name}@{device.host}"
-        result = subprocess.run(
-            [UPSC_BIN, ups_target],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-
-        if result.returncode == 0:
-            # Parse UPS status from output
-            status_line = ""
-            for line in result.stdout.splitlines():
-                if 'ups.status:' in line:
-                    status_line = line.split(':', 1)[1].strip()
-                    break
+        connected, ups_status, error = _run_upsc(device.name, device.host)
 
+        if connected:
             return jsonify({
                 'status': 'success',
                 'message': f'Successfully connected to {device.friendly_name}',
-                'ups_status': status_line or 'ONLINE',
+                'ups_status': ups_status or 'ONLINE',
                 'connected': True
             })
         else:
             return jsonify({
                 'status': 'warning',
-                'message': f'Could not connect to {device.friendly_name}: {result.stderr.strip()}',
+                'message': f'Could not connect to {device.friendly_name}: {error}',
                 'connected': False
             })
 
@@ -349,6 +474,134 @@ def test_connection(ups_id):
         }), 500
 
 
+@ups_management_bp.route('/api/test-all', methods=['POST'])
+def test_all_connections():
+    """
+    Test the connection to every enabled UPS device.
+
+    The upsc probes run concurrently, so the request takes about as long as
+    the slowest device rather than the sum of all of them.
+
+    Returns:
+        JSON: Connection test results, one per device in display order
+    """
+    try:
+        # Read what the probes need here: ORM objects stay in this thread
+        devices = db.session.query(
+            UPSDevice.id, UPSDevice.name, UPSDevice.host, UPSDevice.friendly_name
+        ).filter(UPSDevice.is_enabled.is_(True)).order_by(UPSDevice.order_index, UPSDevice.id).all()
+
+        results = []
+        if devices:
+            workers = min(MAX_TEST_WORKERS, len(devices))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lambda device: _test_device(*device), devices))
+
+        return jsonify({
+            'status': 'success',
+            'results': results,
+            'connected': sum(1 for result in results if result['connected']),
+            'count': len(results)
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Error testing UPS connections: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Error testing connections: {str(e)}'
+        }), 500
+
+
+def write_nut_config_file(filepath, content):
+    """
+    Atomically replace a NUT configuration file, unless it already holds
+    the given content.
+
+    The content is written to a temporary file in the same directory, which
+    takes the mode and ownership of the current file and is then renamed
+    over it, so NUT never reads a partially written file.
+
+    Args:
+        filepath: Path of the configuration file
+        content: New file content
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged
+    """
+    data = content.encode('utf-8')
+
+    try:
+        current = os.stat(filepath)
+    except FileNotFoundError:
+        current = None
+
+    # A file of another size cannot match, so it is only read when the
+    # sizes are equal
+    if current is not None and current.st_size == len(data):
+        with open(filepath, 'rb') as f:
+            if f.read() == data:
+                return False
+
+    directory, filename = os.path.split(filepath)
+    tmp_path = os.path.join(directory, f'.{filename}.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if current is not None:
+                os.fchmod(fd, current.st_mode & 0o7777)
+                try:
+                    os.fchown(fd, current.st_uid, current.st_gid)
+                except PermissionError:
+                    pass
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return True
+
+
+def _run_scheduled_regeneration(app):
+    """Regenerate the NUT configuration files from a timer thread."""
+    with app.app_context(), _regenerate_lock:
+        regenerate_nut_configs()
+
+
+def schedule_nut_config_regeneration():
+    """
+    Regenerate the NUT configuration files REGENERATE_DELAY seconds after
+    the last device change.
+
+    Each call restarts the delay, so several changes in quick succession
+    lead to a single regeneration. Requests with ?immediate=1 regenerate
+    before returning instead.
+
+    Must be called while handling a request.
+    """
+    global _regenerate_timer
+
+    if request.args.get('immediate') == '1':
+        with _regenerate_lock:
+            regenerate_nut_configs()
+        return
+
+    app = current_app._get_current_object()
+    with _regenerate_timer_lock:
+        if _regenerate_timer is not None:
+            _regenerate_timer.cancel()
+        _regenerate_timer = threading.Timer(REGENERATE_DELAY, _run_scheduled_regeneration, args=(app,))
+        _regenerate_timer.daemon = True
+        _regenerate_timer.start()
+
+
 def regenerate_nut_configs():
     """
     Regenerate all NUT configuration files from the database.
@@ -357,19 +610,8 @@ def regenerate_nut_configs():
     the NUT configuration files are kept in sync with the database.
     """
     try:
-        from core.nut_config.conf_manager import NUTConfManager
-
-        # Get the templates directory
-        templates_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            'nut_config',
-            'conf_templates'
-        )
-
-        conf_manager = NUTConfManager(templates_dir)
-
         # Regenerate configs from database
-        conf_files = conf_manager.regenerate_configs_from_db()
+        conf_files = _conf_manager.regenerate_configs_from_db()
 
         if not conf_files:
             logger.warning("⚠️ No configuration files generated")
@@ -377,16 +619,26 @@ def regenerate_nut_configs():
 
         # Write configuration files to /etc/nut/
         config_dir = '/etc/nut'
+        changed = set()
         for filename, content in conf_files.items():
             filepath = os.path.join(config_dir, filename)
-            with open(filepath, 'w') as f:
-                f.write(content)
-            logger.debug(f"✅ Regenerated {filename}")
+            if write_nut_config_file(filepath, content):
+                changed.add(filename)
+                logger.debug(f"✅ Regenerated {filename}")
+            else:
+                logger.debug(f"{filename} is unchanged")
+
+        # A change that does not affect the generated files (e.g. a new
+        # friendly name) needs no driver restart
+        if not changed:
+            logger.info("NUT configuration files are unchanged, services not restarted")
+            return True
 
         logger.info("✅ NUT configuration files regenerated successfully")
 
-        # Restart NUT services to apply changes
-        restart_nut_services()
+        # Restart NUT services to apply changes; the drivers only read
+        # nut.conf and ups.conf
+        restart_nut_services(reload_only=changed.isdisjoint(DRIVER_CONFIG_FILES))
 
         return True
 
@@ -395,19 +647,27 @@ def regenerate_nut_configs():
         return False
 
 
-def restart_nut_services():
+def restart_nut_services(reload_only=False):
     """
     Restart NUT services to apply configuration changes.
+
+    Args:
+        reload_only: Only reload upsd, leaving the UPS drivers running
     """
     try:
-        # Stop UPS drivers
-        subprocess.run(['upsdrvctl', 'stop'], capture_output=True, timeout=10)
-
-        # Start UPS drivers
-        subprocess.run(['upsdrvctl', 'start'], capture_output=True, timeout=10)
-
-        # Reload upsd
-        subprocess.run(['upsd', '-c', 'reload'], capture_output=True, timeout=10)
+        if reload_only:
+            subprocess.run(['upsd', '-c', 'reload'], capture_output=True, timeout=10)
+            logger.info("✅ upsd reloaded successfully")
+            return
+
+        # Stop and start the UPS drivers, then reload upsd, in one shell.
+        # Each step runs even if the one before failed (e.g. no driver was
+        # running to stop)
+        subprocess.run(
+            ['sh', '-c', 'upsdrvctl stop; upsdrvctl start; upsd -c reload'],
+            capture_output=True,
+            timeout=30
+        )
 
         logger.info("✅ NUT services restarted successfully")
 
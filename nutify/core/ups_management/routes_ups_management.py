@@ -5,6 +5,7 @@ This module provides the web page routes for the UPS management interface.
 """
 
 from flask import render_template, redirect, url_for, flash
+from sqlalchemy.orm import load_only
 from core.ups_management import ups_management_bp
 from core.logger import database_logger as logger
 from core.db.orm import UPSDevice
@@ -20,8 +21,13 @@ def list_devices():
         Rendered HTML template showing UPS device grid
     """
     try:
-        # Get all UPS devices from database (enabled and disabled)
-        devices = UPSDevice.query.order_by(UPSDevice.order_index, UPSDevice.id).all()
+        # Get all UPS devices from database (enabled and disabled), loading
+        # only the columns the device cards show
+        devices = UPSDevice.query.options(load_only(
+            UPSDevice.id, UPSDevice.name, UPSDevice.friendly_name, UPSDevice.driver,
+            UPSDevice.port, UPSDevice.host, UPSDevice.description, UPSDevice.serial,
+            UPSDevice.is_enabled, UPSDevice.is_primary
+        )).order_by(UPSDevice.order_index, UPSDevice.id).all()
 
         logger.info(f"📋 Displaying {len(devices)} UPS device(s) in management page")
 